@@ -0,0 +1,57 @@
+"""
+OpenAI Batch API (génération planifiée, non urgente) :
+-50% de coût et quota de rate-limit séparé, résultat sous 24h.
+Les lignes JSONL portent un custom_id ; l'engine garde le contexte du job (site, topic...) côté PG.
+"""
+
+import orjson
+from openai import AsyncOpenAI
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+BATCH_COMPLETION_WINDOW = "24h"
+
+# Statuts OpenAI terminaux sans résultat exploitable
+BATCH_FAILED_STATUSES = {"failed", "expired", "cancelled"}
+
+
+def build_batch_line(custom_id: str, body: dict) -> bytes:
+    return orjson.dumps({"custom_id": custom_id, "method": "POST", "url": BATCH_ENDPOINT, "body": body})
+
+
+async def submit_batch(client: AsyncOpenAI, lines: list[bytes]) -> str:
+    """
+    Upload du JSONL + création du batch. Retourne l'id du batch OpenAI.
+    """
+    jsonl = b"\n".join(lines) + b"\n"
+    f = await client.files.create(file=("llmgeo-batch.jsonl", jsonl), purpose="batch")
+    batch = await client.batches.create(
+        input_file_id=f.id,
+        endpoint=BATCH_ENDPOINT,
+        completion_window=BATCH_COMPLETION_WINDOW,
+    )
+    return batch.id
+
+
+async def fetch_batch_results(client: AsyncOpenAI, batch_id: str) -> tuple[str, dict[str, str | None]]:
+    """
+    Retourne (status, résultats). Résultats = {custom_id: texte de la complétion (None si erreur)},
+    vide tant que le batch n'est pas "completed".
+    """
+    batch = await client.batches.retrieve(batch_id)
+    if batch.status != "completed" or not batch.output_file_id:
+        return batch.status, {}
+
+    content = await client.files.content(batch.output_file_id)
+    results: dict[str, str | None] = {}
+    for raw in content.content.splitlines():
+        if not raw.strip():
+            continue
+        line = orjson.loads(raw)
+        resp = line.get("response") or {}
+        text = None
+        if not line.get("error") and resp.get("status_code") == 200:
+            choices = (resp.get("body") or {}).get("choices") or []
+            if choices:
+                text = (choices[0].get("message") or {}).get("content")
+        results[line.get("custom_id") or ""] = text
+    return batch.status, results
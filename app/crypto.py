@@ -0,0 +1,30 @@
+import hashlib
+import hmac
+from functools import lru_cache
+
+
+@lru_cache(maxsize=1024)
+def _hmac_base(secret: bytes) -> "hmac.HMAC":
+    # État HMAC après absorption de la clé (ipad/opad), une fois par secret de site ; cloné à chaque signature
+    return hmac.new(secret, digestmod=hashlib.sha256)
+
+
+def hmac_sign(secret: str | bytes, method: str, path: str, ts: str, body: str | bytes) -> str:
+    """
+    Signature HMAC-SHA256 attendue par le plugin WP (headers X-LLMGEO-TS / X-LLMGEO-SIGN).
+    payload = "METHOD\\nPATH\\nTS\\nBODY"
+    """
+    if isinstance(secret, str):
+        secret = secret.encode("utf-8")
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    # payload construit directement en bytes : une seule allocation
+    payload = b"%b\n%b\n%b\n%b" % (method.encode("ascii"), path.encode("utf-8"), ts.encode("ascii"), body)
+    # copy() de l'état pré-calculé : la clé n'est pas re-dérivée à chaque appel WP
+    h = _hmac_base(secret).copy()
+    h.update(payload)
+    return h.hexdigest()
+
+
+def sha256_hex(s: str) -> str:
+    return hashlib.sha256(s.encode("utf-8")).hexdigest()
@@ -1,19 +1,30 @@
-from fastapi import FastAPI, HTTPException, Header
-from pydantic import BaseModel, Field
+import asyncio
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, HTTPException, Header, Response
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, ConfigDict, Field
 import os
 import time
-import hmac
-import hashlib
-import json
 import random
+import hmac
 import html
 import re
-import requests
-import psycopg
+import httpx
+import orjson
+from psycopg import AsyncCursor
+from psycopg.types.json import Jsonb, set_json_dumps, set_json_loads
+from psycopg_pool import AsyncConnectionPool
+
+from openai import AsyncOpenAI
 
-from openai import OpenAI
+try:
+    import redis.asyncio as aioredis  # type: ignore
+except Exception:
+    aioredis = None  # noqa
 
-app = FastAPI()
+from app.batch import BATCH_FAILED_STATUSES, build_batch_line, fetch_batch_results, submit_batch
+from app.crypto import hmac_sign, sha256_hex
 
 # =====================
 # Env
@@ -28,13 +39,98 @@ OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4.1-mini")  # modèle par défaut
 if not OPENAI_API_KEY:
     raise RuntimeError("OPENAI_API_KEY manquant")
 
-client = OpenAI(api_key=OPENAI_API_KEY)
+client = AsyncOpenAI(api_key=OPENAI_API_KEY)
 
 HTTP_TIMEOUT = int(os.getenv("HTTP_TIMEOUT", "60"))
+OPENAI_TIMEOUT = int(os.getenv("OPENAI_TIMEOUT", "180"))  # budget total d'une génération (stream compris)
 MAX_MEDIA = int(os.getenv("MAX_MEDIA", "20"))
+# Plusieurs sujets par complétion (amortit le quota RPM) ; max_tokens multiplié par le nombre d'articles
+OPENAI_MAX_TOPICS = int(os.getenv("OPENAI_MAX_TOPICS", "5"))
+OPENAI_MAX_TOKENS_PER_ARTICLE = int(os.getenv("OPENAI_MAX_TOKENS_PER_ARTICLE", "0"))  # 0 = pas de limite
+# Réservation "pending" d'articles (publish_draft) plus vieille que ça : publication interrompue, ligne reprise
+PENDING_RESERVATION_TIMEOUT = int(os.getenv("PENDING_RESERVATION_TIMEOUT", "900"))
+# Batch resté "processing" plus longtemps (poll interrompu : crash, redeploy) : repris par le poll suivant
+BATCH_PROCESSING_TIMEOUT = int(os.getenv("BATCH_PROCESSING_TIMEOUT", "1800"))
+# Items d'un batch terminé publiés en parallèle (un POST WP chacun), au plus N à la fois
+BATCH_PUBLISH_CONCURRENCY = max(1, int(os.getenv("BATCH_PUBLISH_CONCURRENCY", "5")))
+
+# Pool Postgres (connexions réutilisées entre requêtes)
+PG_POOL_MIN = int(os.getenv("PG_POOL_MIN", "2"))
+PG_POOL_MAX = int(os.getenv("PG_POOL_MAX", "20"))
+PG_SSLMODE = os.getenv("PG_SSLMODE", "").strip()  # ex: "require" (vide = valeur de DATABASE_URL / libpq)
+PG_KEEPALIVES_IDLE = int(os.getenv("PG_KEEPALIVES_IDLE", "30"))
+
+# Caches in-process (sites / memories changent rarement)
+SITE_CACHE_TTL = int(os.getenv("SITE_CACHE_TTL", "300"))
+MEMORY_CACHE_TTL = int(os.getenv("MEMORY_CACHE_TTL", "30"))
+CACHE_MAXSIZE = int(os.getenv("CACHE_MAXSIZE", "512"))
+HASH_CACHE_TTL = int(os.getenv("HASH_CACHE_TTL", "3600"))
+HASH_CACHE_MAXSIZE = int(os.getenv("HASH_CACHE_MAXSIZE", "10000"))
+
+# Optionnel : cache sites partagé entre instances de l'engine (même Redis que le worker)
+REDIS_URL = os.getenv("REDIS_URL", "").strip()
 
 # Optionnel : sécuriser les endpoints d’écriture
 ENGINE_ADMIN_TOKEN = os.getenv("ENGINE_ADMIN_TOKEN", "").strip()
+_ADMIN_TOKEN_BYTES = ENGINE_ADMIN_TOKEN.encode("utf-8")
+
+
+# jsonb lu depuis PG (memories.value...) décodé par orjson plutôt que json stdlib
+set_json_loads(orjson.loads)
+# Paramètres Jsonb(...) encodés par orjson, bytes passés tels quels au protocole (pas de str intermédiaire)
+set_json_dumps(lambda obj: orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS))
+
+
+# =====================
+# Lifespan (clients partagés)
+# =====================
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Client HTTP partagé (keep-alive / HTTP2 vers les WP) + pool Postgres async
+    # httpx garde un pool par origine (schéma + host + port) : chaque WP conserve ses connexions TLS chaudes.
+    # retries= : nouvelle tentative uniquement sur échec de connexion (jamais après envoi de la requête).
+    app.state.http = httpx.AsyncClient(
+        timeout=HTTP_TIMEOUT,
+        transport=httpx.AsyncHTTPTransport(
+            http2=True,
+            retries=2,
+            limits=httpx.Limits(max_keepalive_connections=32, max_connections=64),
+        ),
+    )
+    # TCP keepalive : les connexions du pool restent chaudes et les coupures réseau sont détectées
+    pg_kwargs = {"prepare_threshold": 5, "keepalives": 1, "keepalives_idle": PG_KEEPALIVES_IDLE}
+    if PG_SSLMODE:
+        pg_kwargs["sslmode"] = PG_SSLMODE
+    app.state.db_pool = AsyncConnectionPool(
+        DATABASE_URL,
+        min_size=PG_POOL_MIN,
+        max_size=PG_POOL_MAX,
+        kwargs=pg_kwargs,
+        # connexion longue durée : vérifiée à l'emprunt (redémarrage PG, coupure idle...)
+        check=AsyncConnectionPool.check_connection,
+        open=False,
+    )
+    await app.state.db_pool.open(wait=True)
+    app.state.redis = None
+    if REDIS_URL and aioredis is not None:
+        try:
+            app.state.redis = aioredis.Redis.from_url(REDIS_URL)
+            await app.state.redis.ping()
+        except Exception as e:
+            print(f"[engine] redis disabled: {e}", flush=True)
+            app.state.redis = None
+    try:
+        yield
+    finally:
+        await app.state.http.aclose()
+        await app.state.db_pool.close()
+        await client.close()
+        if app.state.redis is not None:
+            await app.state.redis.aclose()
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 
 # =====================
@@ -42,109 +138,257 @@ ENGINE_ADMIN_TOKEN = os.getenv("ENGINE_ADMIN_TOKEN", "").strip()
 # =====================
 
 class GenerateIn(BaseModel):
+    model_config = ConfigDict(extra="ignore", str_strip_whitespace=True)
+
     topic_key: str = Field(..., description="Cluster / sujet à traiter")
     frequency: str = Field(default="1_per_week", description="Fréquence retenue pour planification SEO")
     images_count: int = Field(default=2, ge=0, le=3)
 
 
+class GenerateManyIn(BaseModel):
+    topics: list[GenerateIn] = Field(..., min_length=1, max_length=OPENAI_MAX_TOPICS)
+
+
+class BatchJobIn(BaseModel):
+    model_config = ConfigDict(extra="ignore", str_strip_whitespace=True)
+
+    site_id: str
+    topic_key: str
+    frequency: str = "1_per_week"
+    images_count: int = Field(default=2, ge=0, le=3)
+
+
+class BatchIn(BaseModel):
+    jobs: list[BatchJobIn] = Field(..., min_length=1, description="Brouillons à générer via l'API Batch OpenAI")
+
+
 # =====================
 # Helpers DB
 # =====================
 
 def db_connect():
-    return psycopg.connect(DATABASE_URL)
+    # Seul point d'accès à Postgres : emprunte une connexion du pool (rendue en sortie de `async with`).
+    # Règle : les helpers DB reçoivent le curseur de l'endpoint et n'appellent jamais db_connect()
+    # eux-mêmes => une seule connexion / transaction par requête.
+    # Curseurs toujours anonymes (conn.cursor(), côté client) : jamais conn.cursor(name=...) pour ces
+    # petites requêtes ponctuelles, un curseur serveur ajouterait DECLARE/FETCH/CLOSE à chaque appel.
+    return app.state.db_pool.connection()
+
+
+_SITE_CACHE: dict[str, tuple[float, tuple[str, bytes]]] = {}
+_MEMORY_CACHE: dict[tuple[str, str], tuple[float, dict]] = {}
+# (site_id, content_hash) -> (wp_post_id, wp_url) des brouillons déjà créés : doublons court-circuités sans PG
+_HASH_CACHE: dict[tuple[str, str], tuple[float, tuple]] = {}
+
+
+def _cache_get(cache: dict, k, ttl: int):
+    entry = cache.get(k)
+    if entry is None:
+        return None
+    if time.monotonic() - entry[0] >= ttl:
+        cache.pop(k, None)
+        return None
+    return entry[1]
+
+
+def _cache_set(cache: dict, k, value, maxsize: int | None = None):
+    cache.pop(k, None)
+    if len(cache) >= (maxsize or CACHE_MAXSIZE):
+        # dict = ordre d'insertion : on évince l'entrée la plus ancienne
+        cache.pop(next(iter(cache)))
+    cache[k] = (time.monotonic(), value)
 
 
 def require_admin_token(x_engine_token: str | None):
     if not ENGINE_ADMIN_TOKEN:
         return
-    if not x_engine_token or x_engine_token != ENGINE_ADMIN_TOKEN:
+    # comparaison à temps constant (bytes : compare_digest refuse les str non ASCII)
+    if not x_engine_token or not hmac.compare_digest(x_engine_token.encode("utf-8"), _ADMIN_TOKEN_BYTES):
         raise HTTPException(status_code=401, detail="Unauthorized")
 
 
 # =====================
-# Helpers HMAC / WP
+# Helpers sites / WP
 # =====================
 
-def hmac_sign(secret: str, method: str, path: str, ts: str, body: str) -> str:
-    payload = f"{method}\n{path}\n{ts}\n{body}".encode("utf-8")
-    return hmac.new(secret.encode("utf-8"), payload, hashlib.sha256).hexdigest()
+def _site_redis_key(site_id: str) -> str:
+    return "engine:site:" + site_id
+
 
+async def cached_site(site_id: str) -> tuple[str, bytes] | None:
+    # (site_url, secret) si encore valide en cache (process puis Redis), sans emprunter de connexion PG
+    site = _cache_get(_SITE_CACHE, site_id, SITE_CACHE_TTL)
+    if site is not None or app.state.redis is None:
+        return site
+    try:
+        raw = await app.state.redis.get(_site_redis_key(site_id))
+    except Exception:
+        return None  # Redis indisponible : repli sur PG
+    if not raw:
+        return None
+    site_url, secret = orjson.loads(raw)
+    site = (site_url, secret.encode("utf-8"))
+    _cache_set(_SITE_CACHE, site_id, site)
+    return site
+
+
+async def invalidate_site(site_id: str):
+    # URL ou secret changés côté WP (401/403/404) : la prochaine requête relit la table sites
+    _SITE_CACHE.pop(site_id, None)
+    if app.state.redis is not None:
+        try:
+            await app.state.redis.delete(_site_redis_key(site_id))
+        except Exception:
+            pass
 
-def sha256_hex(s: str) -> str:
-    return hashlib.sha256(s.encode("utf-8")).hexdigest()
 
+async def get_site(cur: AsyncCursor, site_id: str) -> tuple[str, bytes]:
+    cached = await cached_site(site_id)
+    if cached is not None:
+        return cached
 
-def get_site(cur, site_id: str):
-    cur.execute(
+    await cur.execute(
         "SELECT site_url, secret FROM sites WHERE id = %s AND is_active = true",
         (site_id,),
+        prepare=True,
     )
-    row = cur.fetchone()
+    row = await cur.fetchone()
     if not row:
         raise HTTPException(status_code=404, detail="Site non trouvé ou inactif")
-    return row[0], row[1]
+    # secret encodé une fois au remplissage du cache : hmac_sign le reçoit déjà en bytes
+    site = (row[0], row[1].encode("utf-8"))
+    _cache_set(_SITE_CACHE, site_id, site)
+    if app.state.redis is not None:
+        try:
+            await app.state.redis.setex(_site_redis_key(site_id), SITE_CACHE_TTL, orjson.dumps([row[0], row[1]]))
+        except Exception:
+            pass
+    return site
+
+
+async def memory_upsert(cur: AsyncCursor, site_id: str, key: str, value: dict):
+    await memory_upsert_many(cur, site_id, {key: value})
 
 
-def memory_upsert(cur, site_id: str, key: str, value: dict):
-    cur.execute(
+async def memory_upsert_many(cur: AsyncCursor, site_id: str, values: dict[str, dict]):
+    """
+    Upsert de plusieurs clés de memories en un seul aller-retour :
+    l'objet {key: value} est envoyé en un paramètre jsonb et éclaté côté PG (jsonb_each).
+    """
+    await cur.execute(
         """
         INSERT INTO memories (site_id, key, value)
-        VALUES (%s, %s, %s::jsonb)
+        SELECT %s, t.key, t.value FROM jsonb_each(%s) AS t
         ON CONFLICT (site_id, key)
         DO UPDATE SET value = EXCLUDED.value, updated_at = now()
         """,
-        (site_id, key, json.dumps(value, ensure_ascii=False, separators=(",", ":"))),
+        (site_id, Jsonb(values)),
+        prepare=True,
     )
+    for key in values:
+        _MEMORY_CACHE.pop((site_id, key), None)
 
 
-def memory_get(cur, site_id: str, key: str) -> dict:
-    cur.execute("SELECT value FROM memories WHERE site_id = %s AND key = %s", (site_id, key))
-    row = cur.fetchone()
-    if not row:
-        return {}
-    val = row[0]
+def _memory_value(val) -> dict:
     if isinstance(val, dict):
         return val
     try:
-        return json.loads(val)
+        return orjson.loads(val)
     except Exception:
         return {}
 
 
-def wp_signed_get(site_url: str, secret: str, call_path: str, sign_path: str) -> dict:
+async def memory_get(cur: AsyncCursor, site_id: str, key: str) -> dict:
+    return (await memory_get_many(cur, site_id, [key]))[key]
+
+
+async def memory_get_many(cur: AsyncCursor, site_id: str, keys: list[str]) -> dict[str, dict]:
+    """
+    Lit plusieurs clés de memories en un seul aller-retour Postgres (cache TTL d'abord).
+    Les clés absentes valent {}.
+    """
+    out: dict[str, dict] = {}
+    missing = []
+    for key in keys:
+        cached = _cache_get(_MEMORY_CACHE, (site_id, key), MEMORY_CACHE_TTL)
+        if cached is not None:
+            out[key] = cached
+        else:
+            missing.append(key)
+
+    if missing:
+        await cur.execute(
+            "SELECT key, value FROM memories WHERE site_id = %s AND key = ANY(%s)",
+            (site_id, missing),
+            prepare=True,
+        )
+        for key, val in await cur.fetchall():
+            val = _memory_value(val)
+            if val:
+                _cache_set(_MEMORY_CACHE, (site_id, key), val)
+            out[key] = val
+
+    for key in keys:
+        out.setdefault(key, {})
+    return out
+
+
+# Réponses WP qui signalent un site déplacé / un secret changé : le cache sites est invalidé
+_WP_STALE_SITE_STATUSES = {401, 403, 404}
+# Erreurs httpx où la requête n'a jamais été envoyée (rien n'a pu être créé côté WP)
+_WP_UNSENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+class WPRejected(HTTPException):
+    """Appel WP sans effet côté WP à coup sûr (requête jamais envoyée / refusée en 4xx)."""
+
+
+async def wp_signed_get(site_id: str, site_url: str, secret: bytes, call_path: str, sign_path: str) -> dict:
     ts = str(int(time.time()))
     sig = hmac_sign(secret, "GET", sign_path, ts, "")
-    r = requests.get(
-        site_url.rstrip("/") + call_path,
-        headers={"X-LLMGEO-TS": ts, "X-LLMGEO-SIGN": sig},
-        timeout=HTTP_TIMEOUT,
-    )
+    try:
+        r = await app.state.http.get(
+            site_url.rstrip("/") + call_path,
+            headers={"X-LLMGEO-TS": ts, "X-LLMGEO-SIGN": sig},
+        )
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=502, detail=f"WP GET injoignable: {e!r}")
     if r.status_code >= 400:
+        if r.status_code in _WP_STALE_SITE_STATUSES:
+            await invalidate_site(site_id)
         raise HTTPException(status_code=502, detail=f"WP GET erreur {r.status_code}: {r.text[:300]}")
     try:
-        return r.json()
+        return orjson.loads(r.content)
     except Exception:
         raise HTTPException(status_code=502, detail="WP GET réponse non-JSON")
 
 
-def wp_signed_post(site_url: str, secret: str, path: str, body_json: str) -> dict:
+async def wp_signed_post(site_id: str, site_url: str, secret: bytes, path: str, body: bytes) -> dict:
+    # body = JSON déjà encodé (orjson) : signé et envoyé tel quel, sans ré-encodage
     ts = str(int(time.time()))
-    sig = hmac_sign(secret, "POST", path, ts, body_json)
-    r = requests.post(
-        site_url.rstrip("/") + path,
-        data=body_json.encode("utf-8"),
-        headers={
-            "Content-Type": "application/json",
-            "X-LLMGEO-TS": ts,
-            "X-LLMGEO-SIGN": sig,
-        },
-        timeout=HTTP_TIMEOUT,
-    )
+    sig = hmac_sign(secret, "POST", path, ts, body)
+    try:
+        r = await app.state.http.post(
+            site_url.rstrip("/") + path,
+            content=body,
+            headers={
+                "Content-Type": "application/json",
+                "X-LLMGEO-TS": ts,
+                "X-LLMGEO-SIGN": sig,
+            },
+        )
+    except _WP_UNSENT_ERRORS as e:
+        raise WPRejected(status_code=502, detail=f"WP POST injoignable: {e!r}")
+    except httpx.HTTPError as e:
+        # timeout de lecture / connexion coupée : WP a pu traiter la requête
+        raise HTTPException(status_code=502, detail=f"WP POST sans réponse: {e!r}")
     if r.status_code >= 400:
-        raise HTTPException(status_code=502, detail=f"WP POST erreur {r.status_code}: {r.text[:300]}")
+        if r.status_code in _WP_STALE_SITE_STATUSES:
+            await invalidate_site(site_id)
+        exc = WPRejected if r.status_code < 500 else HTTPException
+        raise exc(status_code=502, detail=f"WP POST erreur {r.status_code}: {r.text[:300]}")
     try:
-        return r.json()
+        return orjson.loads(r.content)
     except Exception:
         raise HTTPException(status_code=502, detail="WP POST réponse non-JSON")
 
@@ -162,6 +406,18 @@ def pick_images(media_cache: dict, k: int) -> list[dict]:
     return random.sample(items, k)
 
 
+def escape_html(s: str, quote: bool = True) -> str:
+    # URLs / alt / titres n'ont presque jamais de caractère spécial : test `in` (C) avant les 5 replace
+    # de html.escape. Même sortie que html.escape (un str.translate par dict est plus lent ici).
+    if "&" in s or "<" in s or ">" in s or (quote and ('"' in s or "'" in s)):
+        return html.escape(s, quote=quote)
+    return s
+
+
+# Gabarit figure : partie fixe préparée une fois, seuls les attributs variables sont formatés
+_FIGURE_TMPL = '<figure class="llmgeo-media"><img src="{src}" alt="{alt}" loading="lazy"{w_attr}{h_attr}>{caption}</figure>'
+
+
 def image_to_figure_html(img: dict) -> str:
     url = img.get("url") or ""
     alt = (img.get("alt") or "").strip()
@@ -172,16 +428,33 @@ def image_to_figure_html(img: dict) -> str:
     if not url:
         return ""
 
-    alt_esc = html.escape(alt, quote=True) if alt else ""
-    cap_esc = html.escape(caption, quote=False) if caption else ""
+    alt_esc = escape_html(alt) if alt else ""
+    cap_esc = escape_html(caption, quote=False) if caption else ""
     w_attr = f' width="{int(width)}"' if isinstance(width, int) else ""
     h_attr = f' height="{int(height)}"' if isinstance(height, int) else ""
 
-    fig = f'<figure class="llmgeo-media"><img src="{html.escape(url, quote=True)}" alt="{alt_esc}" loading="lazy"{w_attr}{h_attr}>'
-    if cap_esc:
-        fig += f"<figcaption>{cap_esc}</figcaption>"
-    fig += "</figure>"
-    return fig
+    return _FIGURE_TMPL.format_map(
+        {
+            "src": escape_html(url),
+            "alt": alt_esc,
+            "w_attr": w_attr,
+            "h_attr": h_attr,
+            "caption": f"<figcaption>{cap_esc}</figcaption>" if cap_esc else "",
+        }
+    )
+
+
+# Compilé une fois à l'import (le cache interne de re est partagé et borné)
+_P_END_RE = re.compile(r"</p\s*>", re.IGNORECASE)
+
+
+def _find_all(s: str, sub: str) -> list[int]:
+    out = []
+    i = s.find(sub)
+    while i >= 0:
+        out.append(i)
+        i = s.find(sub, i + len(sub))
+    return out
 
 
 def inject_figures_into_html(content_html: str, figures: list[str]) -> str:
@@ -191,272 +464,644 @@ def inject_figures_into_html(content_html: str, figures: list[str]) -> str:
 
     html_in = content_html or ""
     # inject after first paragraph if possible
-    m = re.search(r"</p\s*>", html_in, flags=re.IGNORECASE)
-    if m:
-        idx = m.end()
-        first = figures[0]
-        rest = figures[1:]
-        html_in = html_in[:idx] + "\n" + first + "\n" + html_in[idx:]
-        if rest:
-            # inject remaining near middle
-            parts = html_in.split("</h2>")
-            if len(parts) >= 2:
-                mid = len(parts) // 2
-                parts[mid] = parts[mid] + "\n" + "\n".join(rest) + "\n"
-                html_in = "</h2>".join(parts)
-            else:
-                html_in += "\n" + "\n".join(rest) + "\n"
-        return html_in
-
-    # fallback: prepend
-    return "\n".join(figures) + "\n" + html_in
-
-
-def build_internal_links_block(cur, site_id: str, topic_key: str, limit: int = 5) -> str:
-    cur.execute(
+    m = _P_END_RE.search(html_in)
+    if not m:
+        # fallback: prepend
+        return "".join(("\n".join(figures), "\n", html_in))
+
+    # Points d'insertion calculés sur le HTML d'origine, puis un seul "".join (pas de copies intermédiaires)
+    inserts = [(m.end(), figures[0])]
+    rest = figures[1:]
+    if rest:
+        # inject remaining near middle : avant le </h2> du milieu, sinon en fin de contenu
+        h2 = _find_all(html_in, "</h2>")
+        mid = (len(h2) + 1) // 2
+        inserts.append((h2[mid] if mid < len(h2) else len(html_in), "\n".join(rest)))
+    inserts.sort(key=lambda x: x[0])  # tri stable : à position égale, la 1re figure reste devant
+
+    parts = []
+    prev = 0
+    for pos, block in inserts:
+        parts += (html_in[prev:pos], "\n", block, "\n")
+        prev = pos
+    parts.append(html_in[prev:])
+    return "".join(parts)
+
+
+async def build_internal_links_block(cur: AsyncCursor, site_id: str, topic_key: str, limit: int = 5) -> str:
+    await cur.execute(
         """
         SELECT title, wp_url
         FROM articles
-        WHERE site_id = %s AND wp_url IS NOT NULL AND topic_key = %s
+        WHERE site_id = %s AND topic_key = %s AND wp_url IS NOT NULL
         ORDER BY created_at DESC
         LIMIT %s
         """,
         (site_id, topic_key, limit),
+        prepare=True,
     )
-    rows = cur.fetchall() or []
+    rows = await cur.fetchall() or []
     if not rows:
         return ""
 
-    block = "<h2>À lire aussi</h2><ul>"
-    for t, url in rows:
-        if not url:
-            continue
-        t_safe = html.escape(t or "", quote=False)
-        url_safe = html.escape(url, quote=True)
-        block += f'<li><a href="{url_safe}">{t_safe}</a></li>'
-    block += "</ul>"
-    return block
+    items = "".join(
+        f'<li><a href="{escape_html(url)}">{escape_html(t or "", quote=False)}</a></li>'
+        for t, url in rows
+        if url
+    )
+    return f"<h2>À lire aussi</h2><ul>{items}</ul>"
 
 
 # =====================
 # OpenAI generation
 # =====================
 
-def extract_json_object(text: str) -> dict:
-    """
-    Best-effort extraction if the model outputs junk around JSON.
-    """
-    text = (text or "").strip()
-    if not text:
-        return {}
+def parse_openai_json(text: str | None) -> dict:
+    # response_format json_object : la sortie est du JSON strict, pas d'extraction best-effort
     try:
-        return json.loads(text)
-    except Exception:
-        pass
-
-    # Try find first {...} block
-    start = text.find("{")
-    end = text.rfind("}")
-    if start >= 0 and end > start:
-        chunk = text[start : end + 1]
-        try:
-            return json.loads(chunk)
-        except Exception:
-            return {}
-    return {}
+        out = orjson.loads(text or "")
+    except orjson.JSONDecodeError:
+        out = None
+    if not isinstance(out, dict) or not out:
+        raise HTTPException(status_code=500, detail="OpenAI output JSON invalide")
+    return out
 
 
-def openai_generate_article(prompt_text: str) -> dict:
+def openai_request_body(prompt: tuple[str, str], n_articles: int = 1) -> dict:
+    # Paramètres de complétion partagés par l'appel direct (stream) et l'API Batch
+    system, user = prompt
+    body = {
+        "model": OPENAI_MODEL,
+        "messages": [
+            {"role": "system", "content": system},
+            {"role": "user", "content": user},
+        ],
+        "response_format": {"type": "json_object"},
+        "temperature": 0.7,
+    }
+    if OPENAI_MAX_TOKENS_PER_ARTICLE:
+        body["max_tokens"] = OPENAI_MAX_TOKENS_PER_ARTICLE * n_articles
+    return body
+
+
+def articles_for_topics(out: dict, topic_keys: list[str]) -> list[dict]:
+    """
+    {"articles": [...]} -> un article par topic_key, dans l'ordre demandé ({} si absent).
+    Appariement par topic_key renvoyé par le modèle ; les sujets sans correspondance prennent, dans l'ordre,
+    les articles restés non appariés (jamais un article déjà attribué à un autre sujet).
+    """
+    arts = [a for a in (out.get("articles") or []) if isinstance(a, dict)]
+    wanted = set(topic_keys)
+    by_key: dict[str, dict] = {}
+    leftovers = []
+    for a in arts:
+        k = a.get("topic_key")
+        if k in wanted and k not in by_key:
+            by_key[k] = a
+        else:
+            leftovers.append(a)
+    rest = iter(leftovers)
+    return [by_key.get(k) or next(rest, {}) for k in topic_keys]
+
+
+async def _openai_stream_text(prompt: tuple[str, str], n_articles: int) -> str:
+    stream = await client.chat.completions.create(**openai_request_body(prompt, n_articles), stream=True)
+    parts: list[str] = []
+    checked = False
+    # async with : réponse HTTP fermée aussi sur fail fast / annulation (wait_for), pas au GC
+    async with stream:
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if not delta:
+                continue
+            parts.append(delta)
+            # fail fast : en mode JSON la sortie doit commencer par "{" (espaces / sauts de ligne de tête
+            # ignorés), inutile d'attendre la fin ; vérifié une fois, au premier caractère non blanc
+            if not checked:
+                head = "".join(parts).lstrip()
+                if head:
+                    if not head.startswith("{"):
+                        raise HTTPException(status_code=500, detail="OpenAI output JSON invalide")
+                    checked = True
+    return "".join(parts)
+
+
+async def openai_generate_articles(prompt: tuple[str, str], topic_keys: list[str]) -> list[dict]:
+    # Budget proportionnel au nombre d'articles demandés dans la complétion
+    timeout = OPENAI_TIMEOUT * len(topic_keys)
     try:
-        resp = client.chat.completions.create(
-            model=OPENAI_MODEL,
-            messages=[
-                {"role": "system", "content": "Return STRICT JSON only. No markdown. No extra text."},
-                {"role": "user", "content": prompt_text},
-            ],
-            response_format={"type": "json_object"},
-            temperature=0.7,
-        )
+        text = await asyncio.wait_for(_openai_stream_text(prompt, len(topic_keys)), timeout=timeout)
+    except HTTPException:
+        raise
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail=f"OpenAI timeout ({timeout}s)")
     except Exception as e:
         raise HTTPException(status_code=502, detail=f"OpenAI error: {str(e)}")
 
-    text = (resp.choices[0].message.content or "").strip()
-    out = extract_json_object(text)
-    if not out:
-        raise HTTPException(status_code=500, detail="OpenAI output JSON invalide")
-    return out
+    return articles_for_topics(parse_openai_json(text), topic_keys)
 
 
-def build_openai_prompt(profile: dict, topic_key: str, frequency: str, lang: str) -> str:
-    site = profile.get("site", {}) or {}
-    biz = profile.get("business", {}) or {}
-    settings = profile.get("settings", {}) or {}
+# Gabarits du prompt : texte fixe préparé une seule fois à l'import, seuls les champs variables sont formatés.
+# Prompt caching OpenAI (préfixe identique) : le message system ne contient que les consignes (communes à
+# tous les sites) puis le profil du site (stable entre sujets) ; langue et sujets vont dans le message user.
+_SYSTEM_TMPL = """
+You are a professional SEO writer. Generate one full article per requested topic, in JSON.
+Return STRICT JSON only. No markdown. No extra text.
 
-    region = ", ".join(biz.get("service_area") or [])
-    company = biz.get("company_name", "")
-    target = biz.get("target_audience", "")
-    services = biz.get("primary_services") or []
-    tone = settings.get("tone") or "professional"
-    geo_focus = settings.get("geo_focus") or region
-
-    prompt = f"""
-You are a professional SEO writer. Generate a full article in JSON.
-
-OUTPUT (strict JSON) with keys:
+OUTPUT (strict JSON): {{"articles": [...]}} with one object per topic, in the same order, each with keys:
+- topic_key (string)  // copied as-is from the topic
 - title (string)
 - excerpt (string)
 - content_html (string)  // HTML with <h1>, <h2>, paragraphs, lists
 - meta (object) with keys: meta_title, meta_description, primary_keyword, faq (array)
 
-SITE PROFILE:
-Company: {company}
-Site name: {site.get("name","")}
-Main language: {lang}
-Target audience: {target}
-Services: {services}
-Geo focus (must be explicit in text): {geo_focus}
-
-TOPIC:
-topic_key: {topic_key}
-frequency: {frequency}
-
 REQUIREMENTS:
+- Write in the language given by the user message.
 - content_html must include: an intro, at least 3 <h2> sections, a conclusion.
 - Include a local angle: mention the service area / city/region naturally.
 - Include an FAQ section with at least 3 Q&A (also in meta.faq).
 - Write for humans first, but keep strong SEO structure.
 - Do NOT include images or internal links placeholders. Engine injects them.
+- Each article stands alone: no cross-references between the articles.
 
-Return STRICT JSON only.
-"""
-    return prompt.strip()
+SITE PROFILE:
+Company: {company}
+Site name: {site_name}
+Target audience: {target}
+Services: {services}
+Geo focus (must be explicit in text): {geo_focus}
+""".strip()
 
+_USER_TMPL = """
+Main language: {lang}
 
-# =====================
-# Endpoints
-# =====================
+TOPICS:
+{topics}
 
-@app.get("/health")
-def health():
-    return {"status": "ok"}
+Return STRICT JSON only.
+""".strip()
 
 
-@app.post("/api/sites/{site_id}/analyze")
-def analyze_site(site_id: str, x_engine_token: str | None = Header(default=None)):
-    require_admin_token(x_engine_token)
+def build_openai_prompt(profile: dict, topics: list[tuple[str, str]], lang: str) -> tuple[str, str]:
+    """
+    Retourne (system, user). topics : (topic_key, frequency), OPENAI_MAX_TOPICS au plus — même site / même langue.
+    """
+    site = profile.get("site", {}) or {}
+    biz = profile.get("business", {}) or {}
+    settings = profile.get("settings", {}) or {}
 
-    with db_connect() as conn:
-        with conn.cursor() as cur:
-            site_url, secret = get_site(cur, site_id)
+    region = ", ".join(biz.get("service_area") or [])
+    geo_focus = settings.get("geo_focus") or region
 
-            profile = wp_signed_get(
-                site_url,
-                secret,
-                "/wp-json/llmgeo/v1/site-profile",
-                "/wp-json/llmgeo/v1/site-profile",
-            )
-            media = wp_signed_get(
-                site_url,
-                secret,
-                f"/wp-json/llmgeo/v1/media?per_page={MAX_MEDIA}",
-                "/wp-json/llmgeo/v1/media",
-            )
+    system = _SYSTEM_TMPL.format_map(
+        {
+            "company": biz.get("company_name", ""),
+            "site_name": site.get("name", ""),
+            "target": biz.get("target_audience", ""),
+            "services": biz.get("primary_services") or [],
+            "geo_focus": geo_focus,
+        }
+    )
+    user = _USER_TMPL.format_map(
+        {
+            "lang": lang,
+            "topics": "\n".join(f"- topic_key: {k} | frequency: {f}" for k, f in topics),
+        }
+    )
+    return system, user
 
-            memory_upsert(cur, site_id, "site_profile", profile)
-            memory_upsert(cur, site_id, "media_cache", media)
-            conn.commit()
 
-    return {"status": "ok"}
+# =====================
+# Draft pipeline (génération directe ou par lot OpenAI)
+# =====================
 
+async def load_site_context(site_id: str) -> tuple[dict, dict]:
+    async with db_connect() as conn:
+        async with conn.cursor() as cur:
+            mem = await memory_get_many(cur, site_id, ["site_profile", "media_cache"])
+    profile = mem["site_profile"]
+    if not profile:
+        raise HTTPException(status_code=400, detail="Site non analysé")
+    return profile, mem["media_cache"]
 
-@app.post("/api/sites/{site_id}/generate-draft")
-def generate_draft(site_id: str, payload: GenerateIn, x_engine_token: str | None = Header(default=None)):
-    require_admin_token(x_engine_token)
 
-    with db_connect() as conn:
-        with conn.cursor() as cur:
-            profile = memory_get(cur, site_id, "site_profile")
-            media = memory_get(cur, site_id, "media_cache")
-            if not profile:
-                raise HTTPException(status_code=400, detail="Site non analysé")
-
-            # Language selection: prefer plugin settings if present
-            langs = (profile.get("settings", {}) or {}).get("langs_enabled") or []
-            if not langs:
-                langs = [(profile.get("site", {}) or {}).get("language", "fr_FR").split("_")[0]]
-            lang = random.choice(langs)
-
-            prompt = build_openai_prompt(profile, payload.topic_key, payload.frequency, lang)
-            out = openai_generate_article(prompt)
-
-            title = (out.get("title") or "").strip()
-            excerpt = (out.get("excerpt") or "").strip()
-            content_html = (out.get("content_html") or "").strip()
-
-            if not title or not content_html:
-                raise HTTPException(status_code=500, detail="OpenAI output incomplet (title/content_html)")
-
-            # Duplicate check
-            h = sha256_hex(content_html)
-            cur.execute(
-                "SELECT wp_post_id FROM articles WHERE site_id=%s AND content_hash=%s",
-                (site_id, h),
+async def load_site_contexts(site_ids: list[str]) -> dict[str, tuple[dict, dict] | HTTPException]:
+    # Lots (API Batch) : contexte chargé une fois par site, l'erreur éventuelle gardée pour chaque job du site
+    contexts: dict[str, tuple[dict, dict] | HTTPException] = {}
+    for site_id in dict.fromkeys(site_ids):
+        try:
+            contexts[site_id] = await load_site_context(site_id)
+        except HTTPException as e:
+            contexts[site_id] = e
+    return contexts
+
+
+def pick_lang(profile: dict) -> str:
+    # Language selection: prefer plugin settings if present
+    langs = (profile.get("settings", {}) or {}).get("langs_enabled") or []
+    if not langs:
+        langs = [(profile.get("site", {}) or {}).get("language", "fr_FR").split("_")[0]]
+    return random.choice(langs)
+
+
+async def release_reservation(article_id: int):
+    async with db_connect() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                "DELETE FROM articles WHERE id = %s AND wp_status = %s",
+                (article_id, "pending"),
+                prepare=True,
             )
-            if cur.fetchone():
-                return {"status": "duplicate"}
+            await conn.commit()
+
+
+async def publish_draft(
+    site_id: str,
+    topic_key: str,
+    frequency: str,
+    images_count: int,
+    lang: str,
+    media: dict,
+    out: dict,
+    internal_block: str | None = None,
+) -> dict:
+    """
+    Sortie OpenAI -> dédoublonnage, maillage interne, images, brouillon WP, ligne articles.
+    internal_block : maillage déjà calculé pendant la génération (None = calculé ici).
+    """
+    title = (out.get("title") or "").strip()
+    excerpt = (out.get("excerpt") or "").strip()
+    content_html = (out.get("content_html") or "").strip()
+
+    if not title or not content_html:
+        raise HTTPException(status_code=500, detail="OpenAI output incomplet (title/content_html)")
+
+    h = sha256_hex(content_html)
+    seen = _cache_get(_HASH_CACHE, (site_id, h), HASH_CACHE_TTL)
+    if seen is not None:
+        return {"status": "duplicate", "wp_post_id": seen[0], "wp_url": seen[1]}
 
+    async with db_connect() as conn:
+        async with conn.cursor() as cur:
             # Internal links (same topic)
-            internal_block = build_internal_links_block(cur, site_id, payload.topic_key)
+            if internal_block is None:
+                internal_block = await build_internal_links_block(cur, site_id, topic_key)
             if internal_block:
                 content_html += "\n\n" + internal_block
 
             # Inject images from WP media
-            imgs = pick_images(media or {}, payload.images_count)
+            imgs = pick_images(media or {}, images_count)
             figures = [image_to_figure_html(i) for i in imgs]
             content_html = inject_figures_into_html(content_html, figures)
 
-            # Create draft on WP via HMAC plugin
-            site_url, secret = get_site(cur, site_id)
-            wp_payload = {"title": title, "content": content_html, "excerpt": excerpt}
-            body = json.dumps(wp_payload, ensure_ascii=False, separators=(",", ":"))
-            wp_resp = wp_signed_post(site_url, secret, "/wp-json/llmgeo/v1/draft", body)
-
-            cur.execute(
+            # Duplicate check atomique : réserve (site_id, content_hash) via l'index unique AVANT l'appel WP,
+            # commitée tout de suite => une requête concurrente sur le même contenu voit le conflit immédiatement.
+            # DO UPDATE (no-op) plutôt que DO NOTHING : RETURNING renvoie aussi la ligne existante,
+            # xmax = 0 <=> ligne réellement insérée par cette requête.
+            # Réservation "pending" périmée (issue WP inconnue, process tué pendant l'appel) : supprimée
+            # d'abord, sinon ce contenu serait vu comme doublon pour toujours.
+            await cur.execute(
+                """
+                DELETE FROM articles
+                WHERE site_id = %s AND content_hash = %s AND wp_status = %s
+                  AND created_at < now() - make_interval(secs => %s)
+                """,
+                (site_id, h, "pending", PENDING_RESERVATION_TIMEOUT),
+                prepare=True,
+            )
+            await cur.execute(
                 """
                 INSERT INTO articles (
-                    site_id, wp_post_id, wp_status, wp_url,
-                    title, content_html, excerpt, topic_key, content_hash, meta
+                    site_id, wp_status, title, content_html, excerpt, topic_key, content_hash
                 )
-                VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s::jsonb)
+                VALUES (%s,%s,%s,%s,%s,%s,%s)
+                ON CONFLICT (site_id, content_hash) DO UPDATE SET content_hash = EXCLUDED.content_hash
+                RETURNING id, wp_post_id, wp_url, (xmax = 0) AS inserted
+                """,
+                (site_id, "pending", title, content_html, excerpt, topic_key, h),
+                prepare=True,
+            )
+            article_id, existing_post_id, existing_url, inserted = await cur.fetchone()
+            if not inserted:
+                if existing_url:
+                    _cache_set(_HASH_CACHE, (site_id, h), (existing_post_id, existing_url), HASH_CACHE_MAXSIZE)
+                return {"status": "duplicate", "wp_post_id": existing_post_id, "wp_url": existing_url}
+
+            site_url, secret = await get_site(cur, site_id)
+            await conn.commit()
+
+    # Create draft on WP via HMAC plugin (connexion PG rendue au pool pendant l'appel)
+    wp_payload = {"title": title, "content": content_html, "excerpt": excerpt}
+    body = orjson.dumps(wp_payload)
+    try:
+        wp_resp = await wp_signed_post(site_id, site_url, secret, "/wp-json/llmgeo/v1/draft", body)
+    except WPRejected:
+        # Échec certain (jamais envoyé / 4xx) : réservation libérée, un nouvel essai est possible.
+        # Issue inconnue (timeout, 5xx, annulation) : WP a pu créer le brouillon, la ligne reste "pending"
+        # (doublon évité) et expire après PENDING_RESERVATION_TIMEOUT.
+        await release_reservation(article_id)
+        raise
+
+    async with db_connect() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                """
+                UPDATE articles
+                SET wp_post_id = %s, wp_status = %s, wp_url = %s, meta = %s
+                WHERE id = %s
                 """,
                 (
-                    site_id,
                     wp_resp.get("id"),
                     "draft",
                     wp_resp.get("link"),
-                    title,
-                    content_html,
-                    excerpt,
-                    payload.topic_key,
-                    h,
-                    json.dumps(
+                    Jsonb(
                         {
-                            "frequency": payload.frequency,
+                            "frequency": frequency,
                             "lang": lang,
                             "notified": wp_resp.get("notified"),
                             "edit_link": wp_resp.get("edit_link"),
                             "openai_meta": out.get("meta") or {},
-                        },
-                        ensure_ascii=False,
-                        separators=(",", ":"),
+                        }
                     ),
+                    article_id,
                 ),
+                prepare=True,
+            )
+            await conn.commit()
+    _cache_set(_HASH_CACHE, (site_id, h), (wp_resp.get("id"), wp_resp.get("link")), HASH_CACHE_MAXSIZE)
+
+    return {
+        "status": "created",
+        "article_id": article_id,
+        "wp_url": wp_resp.get("link"),
+        "edit_link": wp_resp.get("edit_link"),
+        "notified": wp_resp.get("notified"),
+    }
+
+
+async def prefetch_publish_context(site_id: str, topic_keys: list[str]) -> dict[str, str]:
+    """
+    Ne dépend pas de la sortie OpenAI : lancé pendant le stream de la complétion.
+    Réchauffe le cache sites (get_site) et calcule le maillage interne de chaque sujet.
+    """
+    async with db_connect() as conn:
+        async with conn.cursor() as cur:
+            await get_site(cur, site_id)
+            return {k: await build_internal_links_block(cur, site_id, k) for k in dict.fromkeys(topic_keys)}
+
+
+async def generate_with_prefetch(site_id: str, prompt: tuple[str, str], topic_keys: list[str]) -> tuple[list[dict], dict[str, str]]:
+    # Génération OpenAI et lectures PG de publication en parallèle (connexion rendue avant la fin du stream)
+    prefetch = asyncio.create_task(prefetch_publish_context(site_id, topic_keys))
+    try:
+        outs = await openai_generate_articles(prompt, topic_keys)
+    except BaseException:
+        prefetch.cancel()
+        raise
+    return outs, await prefetch
+
+
+# =====================
+# Endpoints
+# =====================
+
+# Corps constant (l'env ne change pas après le démarrage), encodé une seule fois à l'import
+_HEALTH_BYTES = orjson.dumps({"status": "ok", "environment": os.getenv("ENVIRONMENT", "unknown")})
+
+
+@app.get("/health")
+async def health():
+    return Response(content=_HEALTH_BYTES, media_type="application/json")
+
+
+@app.post("/api/sites/{site_id}/analyze")
+async def analyze_site(site_id: str, x_engine_token: str | None = Header(default=None)):
+    require_admin_token(x_engine_token)
+
+    site = await cached_site(site_id)
+    if site is None:
+        async with db_connect() as conn:
+            async with conn.cursor() as cur:
+                site = await get_site(cur, site_id)
+    site_url, secret = site
+
+    # Les deux appels plugin sont indépendants : en parallèle, sans garder de connexion PG pendant l'attente
+    profile, media = await asyncio.gather(
+        wp_signed_get(
+            site_id,
+            site_url,
+            secret,
+            "/wp-json/llmgeo/v1/site-profile",
+            "/wp-json/llmgeo/v1/site-profile",
+        ),
+        wp_signed_get(
+            site_id,
+            site_url,
+            secret,
+            f"/wp-json/llmgeo/v1/media?per_page={MAX_MEDIA}",
+            "/wp-json/llmgeo/v1/media",
+        ),
+    )
+
+    async with db_connect() as conn:
+        async with conn.cursor() as cur:
+            await memory_upsert_many(cur, site_id, {"site_profile": profile, "media_cache": media})
+            await conn.commit()
+
+    return {"status": "ok"}
+
+
+@app.post("/api/sites/{site_id}/generate-draft")
+async def generate_draft(site_id: str, payload: GenerateIn, x_engine_token: str | None = Header(default=None)):
+    require_admin_token(x_engine_token)
+
+    profile, media = await load_site_context(site_id)
+    lang = pick_lang(profile)
+
+    prompt = build_openai_prompt(profile, [(payload.topic_key, payload.frequency)], lang)
+    # aucune connexion PG tenue pendant la génération (le prefetch rend la sienne dès ses lectures faites)
+    (out,), links = await generate_with_prefetch(site_id, prompt, [payload.topic_key])
+
+    return await publish_draft(
+        site_id, payload.topic_key, payload.frequency, payload.images_count, lang, media, out,
+        links[payload.topic_key],
+    )
+
+
+@app.post("/api/sites/{site_id}/generate-drafts")
+async def generate_drafts(site_id: str, payload: GenerateManyIn, x_engine_token: str | None = Header(default=None)):
+    """
+    Plusieurs sujets d'un même site en une seule complétion OpenAI, puis publication article par article
+    (un échec n'annule pas les autres).
+    """
+    require_admin_token(x_engine_token)
+
+    profile, media = await load_site_context(site_id)
+    lang = pick_lang(profile)
+
+    topics = payload.topics
+    prompt = build_openai_prompt(profile, [(t.topic_key, t.frequency) for t in topics], lang)
+    outs, links = await generate_with_prefetch(site_id, prompt, [t.topic_key for t in topics])
+
+    results = await asyncio.gather(
+        *(
+            publish_draft(site_id, t.topic_key, t.frequency, t.images_count, lang, media, out, links[t.topic_key])
+            for t, out in zip(topics, outs)
+        ),
+        return_exceptions=True,
+    )
+    drafts = []
+    for t, res in zip(topics, results):
+        if isinstance(res, HTTPException):
+            res = {"status": "error", "detail": res.detail}
+        elif isinstance(res, BaseException):
+            res = {"status": "error", "detail": str(res)}
+        drafts.append({"topic_key": t.topic_key, **res})
+    return {"status": "ok", "lang": lang, "drafts": drafts}
+
+
+@app.post("/api/batches")
+async def create_batch(payload: BatchIn, x_engine_token: str | None = Header(default=None)):
+    """
+    Génération non urgente (worker) : un seul batch OpenAI pour tous les jobs dus.
+    Les brouillons sont publiés par /api/batches/poll une fois le batch terminé.
+    """
+    require_admin_token(x_engine_token)
+
+    lines = []
+    jobs: dict[str, dict] = {}
+    skipped = []
+    contexts = await load_site_contexts([job.site_id for job in payload.jobs])
+    for i, job in enumerate(payload.jobs):
+        ctx = contexts[job.site_id]
+        if isinstance(ctx, HTTPException):
+            skipped.append({"site_id": job.site_id, "topic_key": job.topic_key, "detail": ctx.detail})
+            continue
+        profile, _media = ctx
+        lang = pick_lang(profile)
+        custom_id = f"{i}|{job.site_id}|{job.topic_key}"
+        jobs[custom_id] = {**job.model_dump(), "lang": lang}
+        prompt = build_openai_prompt(profile, [(job.topic_key, job.frequency)], lang)
+        lines.append(build_batch_line(custom_id, openai_request_body(prompt)))
+
+    if not lines:
+        return {"status": "empty", "accepted": [], "skipped": skipped}
+
+    try:
+        batch_id = await submit_batch(client, lines)
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"OpenAI batch error: {str(e)}")
+
+    async with db_connect() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                "INSERT INTO openai_batches (batch_id, status, jobs) VALUES (%s, %s, %s)",
+                (batch_id, "submitted", Jsonb(jobs)),
             )
-            conn.commit()
-
-            return {
-                "status": "created",
-                "wp_url": wp_resp.get("link"),
-                "edit_link": wp_resp.get("edit_link"),
-                "notified": wp_resp.get("notified"),
-            }
+            await conn.commit()
+
+    return {
+        "status": "submitted",
+        "batch_id": batch_id,
+        "accepted": [[j["site_id"], j["topic_key"]] for j in jobs.values()],
+        "skipped": skipped,
+    }
+
+
+async def _publish_batch_item(
+    custom_id: str, job: dict, text: str | None, ctx: tuple[dict, dict] | HTTPException
+) -> dict:
+    try:
+        if isinstance(ctx, HTTPException):
+            raise ctx
+        (out,) = articles_for_topics(parse_openai_json(text), [job["topic_key"]])
+        _profile, media = ctx
+        res = await publish_draft(
+            job["site_id"], job["topic_key"], job["frequency"], job["images_count"], job["lang"], media, out
+        )
+    except HTTPException as e:
+        return {"custom_id": custom_id, "status": "error", "detail": e.detail}
+    except Exception as e:
+        # PG / inattendu : un item en échec n'interrompt jamais le reste du batch
+        return {"custom_id": custom_id, "status": "error", "detail": repr(e)}
+    return {"custom_id": custom_id, **res}
+
+
+def _retry_jobs(jobs: dict, drafts: list[dict] | None = None) -> list[list[str]]:
+    # (site_id, topic_key) à replanifier côté worker : tout le batch, ou ses items en erreur
+    failed = None if drafts is None else {d["custom_id"] for d in drafts if d.get("status") == "error"}
+    return [[j["site_id"], j["topic_key"]] for cid, j in jobs.items() if failed is None or cid in failed]
+
+
+@app.post("/api/batches/poll")
+async def poll_batches(x_engine_token: str | None = Header(default=None)):
+    require_admin_token(x_engine_token)
+
+    # "processing" périmé = poll précédent interrompu en cours de publication : repris
+    # (items déjà publiés => "duplicate" via la réservation content_hash de publish_draft)
+    claimable = "(status = 'submitted' OR (status = 'processing' AND updated_at < now() - make_interval(secs => %s)))"
+    async with db_connect() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                f"SELECT batch_id FROM openai_batches WHERE {claimable} ORDER BY created_at",
+                (BATCH_PROCESSING_TIMEOUT,),
+                prepare=True,  # exécuté à chaque tick du worker (WORKER_BATCH)
+            )
+            batch_ids = [r[0] for r in await cur.fetchall()]
+
+    summary = []
+    for batch_id in batch_ids:
+        try:
+            status, results = await fetch_batch_results(client, batch_id)
+        except Exception as e:
+            summary.append({"batch_id": batch_id, "status": "error", "detail": str(e)})
+            continue
+
+        if status != "completed" and status not in BATCH_FAILED_STATUSES:
+            summary.append({"batch_id": batch_id, "status": status})
+            continue
+
+        # Réclame le batch (un seul poll concurrent le traite)
+        async with db_connect() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(
+                    f"""
+                    UPDATE openai_batches SET status = %s, updated_at = now()
+                    WHERE batch_id = %s AND {claimable}
+                    RETURNING jobs
+                    """,
+                    ("processing" if status == "completed" else status, batch_id, BATCH_PROCESSING_TIMEOUT),
+                )
+                row = await cur.fetchone()
+                await conn.commit()
+        if not row:
+            summary.append({"batch_id": batch_id, "status": status})
+            continue
+        if status != "completed":
+            # Batch perdu (failed / expired / cancelled) : ses jobs sont rendus au worker
+            summary.append({"batch_id": batch_id, "status": status, "retry": _retry_jobs(row[0])})
+            continue
+
+        jobs = row[0]
+        contexts = await load_site_contexts([job["site_id"] for job in jobs.values()])
+        sem = asyncio.Semaphore(BATCH_PUBLISH_CONCURRENCY)
+
+        async def publish_one(cid: str, job: dict) -> dict:
+            async with sem:
+                return await _publish_batch_item(cid, job, results.get(cid), contexts[job["site_id"]])
+
+        # _publish_batch_item ne lève pas (erreurs converties en item "error")
+        drafts = list(await asyncio.gather(*(publish_one(cid, job) for cid, job in jobs.items())))
+
+        async with db_connect() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(
+                    "UPDATE openai_batches SET status = %s, result = %s, updated_at = now() WHERE batch_id = %s",
+                    ("done", Jsonb(drafts), batch_id),
+                )
+                await conn.commit()
+        summary.append({"batch_id": batch_id, "status": "done", "drafts": drafts, "retry": _retry_jobs(jobs, drafts)})
+
+    return {"status": "ok", "batches": summary}
@@ -1,8 +1,12 @@
 import os
 import time
-import json
+import random
+import asyncio
 import hashlib
-import requests
+import heapq
+from functools import lru_cache
+import httpx
+import orjson
 
 try:
     import redis  # type: ignore
@@ -14,7 +18,27 @@ ENGINE_BASE_URL = os.getenv("ENGINE_BASE_URL", "http://127.0.0.1:8000").rstrip("
 ENGINE_ADMIN_TOKEN = os.getenv("ENGINE_ADMIN_TOKEN", "").strip()
 
 HTTP_TIMEOUT = int(os.getenv("HTTP_TIMEOUT", "30"))
-SLEEP_SECONDS = int(os.getenv("WORKER_SLEEP_SECONDS", "60"))
+# /api/batches/poll publie tous les items des batchs terminés avant de répondre : lecture longue
+BATCH_POLL_TIMEOUT = int(os.getenv("WORKER_BATCH_POLL_TIMEOUT", "1800"))
+# Même variable que l'engine : budget OpenAI par sujet, l'engine l'applique × nombre de sujets de l'appel
+OPENAI_TIMEOUT = int(os.getenv("OPENAI_TIMEOUT", "180"))
+SLEEP_SECONDS = int(os.getenv("WORKER_SLEEP_SECONDS", "60"))  # délai avant nouvel essai d'un job en échec
+# Le worker dort jusqu'à la prochaine échéance, borné pour relire l'état (autre instance / Redis modifié)
+MAX_SLEEP_SECONDS = int(os.getenv("WORKER_MAX_SLEEP_SECONDS", "3600"))
+ANALYZE_EVERY = 24 * 3600
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", "10"))
+WORKER_RETRIES = int(os.getenv("WORKER_RETRIES", "3"))
+# Génération via l'API Batch OpenAI (-50%, résultat sous 24h) au lieu d'un appel direct par job
+# Sujets d'un même site regroupés dans une seule complétion (<= OPENAI_MAX_TOPICS côté engine)
+WORKER_TOPICS_PER_CALL = max(1, int(os.getenv("WORKER_TOPICS_PER_CALL", "5")))
+WORKER_BATCH = os.getenv("WORKER_BATCH", "").strip().lower() in ("1", "true", "yes")
+
+# Statuts où l'engine n'a rien créé (rate limit / WP ou OpenAI indisponible) : nouvel essai avec backoff
+RETRY_STATUSES = {429, 502, 503, 504}
+# /generate-drafts : 502 / 504 peuvent venir d'un reverse proxy pendant que l'engine publie encore
+# => issue inconnue, jamais rejoué (doublons) ; seuls 429 / 503 (refus avant génération) le sont
+GENERATE_RETRY_STATUSES = {429, 503}
+GENERATE_UNKNOWN_STATUSES = {502, 504}
 
 AUTO_SITES_JSON = os.getenv("AUTO_SITES_JSON", "[]")
 
@@ -33,6 +57,9 @@ def _freq_to_seconds(freq: str) -> int:
     return 7 * 24 * 3600
 
 
+# Mêmes (site_id, topic_key) à chaque tick : hash mis en cache.
+# SHA-256 conservé (pas de blake2b) : ce sont les clés d'état déjà stockées dans Redis.
+@lru_cache(maxsize=1024)
 def _key(*parts: str) -> str:
     raw = "|".join(parts)
     return hashlib.sha256(raw.encode("utf-8")).hexdigest()
@@ -63,6 +90,33 @@ class StateStore:
             return
         self.mem[k] = ts
 
+    # Variantes « many » : un seul aller-retour Redis (pipeline) par tick au lieu d'un par job
+    def get_ts_many(self, keys: list[str]) -> dict[str, int]:
+        if not keys:
+            return {}
+        if self.r:
+            pipe = self.r.pipeline(transaction=False)
+            for k in keys:
+                pipe.get(k)
+            return {k: int(v) if v else 0 for k, v in zip(keys, pipe.execute())}
+        return {k: int(self.mem.get(k, 0)) for k in keys}
+
+    def set_ts_many(self, keys: list[str], ts: int):
+        if not keys:
+            return
+        if self.r:
+            pipe = self.r.pipeline(transaction=False)
+            for k in keys:
+                pipe.set(k, str(ts))
+            pipe.execute()
+            return
+        for k in keys:
+            self.mem[k] = ts
+
+
+# Corps encodés par orjson (bytes) plutôt que json=... (json stdlib côté httpx)
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
 
 def _headers() -> dict:
     if ENGINE_ADMIN_TOKEN:
@@ -70,9 +124,27 @@ def _headers() -> dict:
     return {}
 
 
-def call_analyze(site_id: str) -> bool:
+async def _post(
+    http: httpx.AsyncClient, url: str, retry_statuses: set[int] = RETRY_STATUSES, **kwargs
+) -> httpx.Response:
+    # Backoff exponentiel + jitter. Pas de retry sur timeout de lecture : l'engine peut encore
+    # être en train de créer le brouillon, un nouvel appel en générerait un second.
+    for attempt in range(WORKER_RETRIES + 1):
+        try:
+            r = await http.post(url, **kwargs)
+        except httpx.ConnectError:
+            if attempt >= WORKER_RETRIES:
+                raise
+        else:
+            if r.status_code not in retry_statuses or attempt >= WORKER_RETRIES:
+                return r
+        await asyncio.sleep(random.uniform(0, 2 ** attempt))
+    raise RuntimeError("unreachable")
+
+
+async def call_analyze(http: httpx.AsyncClient, site_id: str) -> bool:
     url = f"{ENGINE_BASE_URL}/api/sites/{site_id}/analyze"
-    r = requests.post(url, headers=_headers(), timeout=HTTP_TIMEOUT)
+    r = await _post(http, url)
     if r.status_code >= 300:
         print(f"[worker] analyze failed {site_id}: {r.status_code} {r.text[:200]}", flush=True)
         return False
@@ -80,28 +152,115 @@ def call_analyze(site_id: str) -> bool:
     return True
 
 
-def call_generate(site_id: str, topic_key: str, frequency: str, images_count: int) -> bool:
-    url = f"{ENGINE_BASE_URL}/api/sites/{site_id}/generate-draft"
-    payload = {
-        "topic_key": topic_key,
-        "frequency": frequency,
-        "images_count": images_count,
-    }
-    r = requests.post(url, headers=_headers(), json=payload, timeout=HTTP_TIMEOUT)
+async def call_generate(http: httpx.AsyncClient, site_id: str, topics: list[dict]) -> list[str]:
+    """
+    topics : {topic_key, frequency, images_count} d'un même site, générés en une complétion.
+    Retourne les topic_keys traités (créés ou doublons).
+    """
+    url = f"{ENGINE_BASE_URL}/api/sites/{site_id}/generate-drafts"
+    keys = [t["topic_key"] for t in topics]
+    # Lecture : génération (OPENAI_TIMEOUT par sujet) + publication WP, sinon timeout pendant que l'engine publie
+    timeout = httpx.Timeout(HTTP_TIMEOUT, read=OPENAI_TIMEOUT * len(topics) + HTTP_TIMEOUT)
+    try:
+        r = await _post(
+            http,
+            url,
+            GENERATE_RETRY_STATUSES,
+            content=orjson.dumps({"topics": topics}),
+            headers=_JSON_HEADERS,
+            timeout=timeout,
+        )
+    except httpx.ReadTimeout:
+        # Issue inconnue : l'engine a pu publier. Compté comme traité (prochaine période) plutôt que
+        # régénéré dans SLEEP_SECONDS, ce qui publierait les mêmes sujets en double.
+        print(f"[worker] generate timeout {site_id}/{','.join(keys)}: outcome unknown, not retried", flush=True)
+        return keys
+    if r.status_code in GENERATE_UNKNOWN_STATUSES:
+        print(
+            f"[worker] generate {r.status_code} {site_id}/{','.join(keys)}: outcome unknown, not retried",
+            flush=True,
+        )
+        return keys
     if r.status_code >= 300:
-        print(f"[worker] generate failed {site_id}/{topic_key}: {r.status_code} {r.text[:200]}", flush=True)
-        return False
+        print(f"[worker] generate failed {site_id}/{','.join(keys)}: {r.status_code} {r.text[:200]}", flush=True)
+        return []
+    done = []
+    for d in orjson.loads(r.content).get("drafts") or []:
+        topic_key = d.get("topic_key")
+        if d.get("status") in ("created", "duplicate"):
+            done.append(topic_key)
+            print(f"[worker] generate ok {site_id}/{topic_key}: {d}", flush=True)
+        else:
+            print(f"[worker] generate failed {site_id}/{topic_key}: {d.get('detail')}", flush=True)
+    return done
+
+
+async def submit_batch(http: httpx.AsyncClient, jobs: list[dict]) -> set[tuple[str, str]]:
+    """
+    Soumet tous les jobs dus en un seul batch. Retourne les (site_id, topic_key) acceptés.
+    """
+    r = await _post(http, f"{ENGINE_BASE_URL}/api/batches", content=orjson.dumps({"jobs": jobs}), headers=_JSON_HEADERS)
+    if r.status_code >= 300:
+        print(f"[worker] batch submit failed: {r.status_code} {r.text[:200]}", flush=True)
+        return set()
+    out = orjson.loads(r.content)
+    for s in out.get("skipped") or []:
+        print(f"[worker] batch skipped {s.get('site_id')}/{s.get('topic_key')}: {s.get('detail')}", flush=True)
+    print(f"[worker] batch submitted {out.get('batch_id')}: {len(out.get('accepted') or [])} jobs", flush=True)
+    return {(a[0], a[1]) for a in out.get("accepted") or []}
+
+
+async def poll_batches(http: httpx.AsyncClient) -> list[tuple[str, str]]:
+    """
+    Publie les batchs terminés. Retourne les (site_id, topic_key) à replanifier :
+    jobs d'un batch failed / expired / cancelled et items publiés en erreur.
+    """
+    timeout = httpx.Timeout(HTTP_TIMEOUT, read=BATCH_POLL_TIMEOUT)
+    r = await _post(http, f"{ENGINE_BASE_URL}/api/batches/poll", timeout=timeout)
+    if r.status_code >= 300:
+        print(f"[worker] batch poll failed: {r.status_code} {r.text[:200]}", flush=True)
+        return []
+    retry = []
+    for b in orjson.loads(r.content).get("batches") or []:
+        if b.get("status") in ("done", "failed", "expired", "cancelled", "error"):
+            print(f"[worker] batch {b.get('batch_id')}: {b}", flush=True)
+        retry.extend((st[0], st[1]) for st in b.get("retry") or [])
+    return retry
+
+
+async def _bounded(sem: asyncio.Semaphore, coro):
+    async with sem:
+        return await coro
+
+
+async def _tracked(sem: asyncio.Semaphore, label: str, k, coro, on_done) -> list[str]:
     try:
-        out = r.json()
-    except Exception:
-        out = {"raw": r.text[:200]}
-    print(f"[worker] generate ok {site_id}/{topic_key}: {out}", flush=True)
-    return True
+        res = await _bounded(sem, coro)
+    except Exception as e:
+        print(f"[worker] {label} error: {e!r}", flush=True)
+        res = None
+    if isinstance(k, dict):
+        keys, done = list(k.values()), [k[r] for r in res or [] if r in k]
+    else:
+        keys, done = [k], [k] if res else []
+    on_done(keys, done)
+    return done
+
+
+async def _gather_bounded(sem: asyncio.Semaphore, label: str, items: list[tuple[str, object]], on_done) -> list[str]:
+    """
+    Lance les appels en parallèle (au plus WORKER_CONCURRENCY à la fois).
+    items : (state_key, coroutine). Retourne les state_keys des appels réussis.
+    state_key peut être un dict {résultat: state_key} quand la coroutine renvoie la liste de ce qu'elle a traité.
+    on_done(state_keys, réussies) est appelé dès la fin de chaque appel (ts persisté sans attendre les autres).
+    """
+    results = await asyncio.gather(*(_tracked(sem, label, k, c, on_done) for k, c in items))
+    return [k for done in results for k in done]
 
 
 def load_jobs() -> list[dict]:
     try:
-        jobs = json.loads(AUTO_SITES_JSON)
+        jobs = orjson.loads(AUTO_SITES_JSON)
         if isinstance(jobs, list):
             return jobs
     except Exception as e:
@@ -109,52 +268,183 @@ def load_jobs() -> list[dict]:
     return []
 
 
-def main():
+def build_schedule(jobs: list[dict]) -> tuple[dict[str, str], dict[str, dict]]:
+    """
+    Retourne ({state_key: site_id} des analyses, {state_key: job} des générations).
+    Analyse quotidienne par site (dédoublonné, ordre de première apparition conservé).
+    """
+    analyze: dict[str, str] = {}
+    generate: dict[str, dict] = {}
+    for j in jobs:
+        site_id = str(j.get("site_id", "")).strip()
+        topic_key = str(j.get("topic_key", "")).strip()
+        if not site_id:
+            continue
+        analyze.setdefault("analyze:" + _key(site_id), site_id)
+        if not topic_key:
+            continue
+        generate.setdefault("gen:" + _key(site_id, topic_key), {
+            "site_id": site_id,
+            "topic_key": topic_key,
+            "frequency": str(j.get("frequency", "1_per_week")).strip(),
+            "images_count": int(j.get("images_count", 2)),
+        })
+    return analyze, generate
+
+
+async def dispatch_generate(
+    http: httpx.AsyncClient, sem: asyncio.Semaphore, due: dict[str, dict], on_done
+) -> list[str]:
+    # Retourne les state_keys traitées ; on_done appelé pour chaque appel terminé (cf. _gather_bounded)
+    if WORKER_BATCH:
+        # Le ts est posé à la soumission : un job en attente de batch n'est pas resoumis
+        by_job = {(job["site_id"], job["topic_key"]): k for k, job in due.items()}
+        try:
+            accepted = await submit_batch(http, list(due.values()))
+        except Exception as e:
+            print(f"[worker] batch submit error: {e!r}", flush=True)
+            accepted = set()
+        done = [by_job[st] for st in accepted if st in by_job]
+        on_done(list(due), done)
+        return done
+
+    # Jobs dus regroupés par site, par paquets de WORKER_TOPICS_PER_CALL sujets
+    by_site: dict[str, list[tuple[str, dict]]] = {}
+    for k_gen, job in due.items():
+        by_site.setdefault(job["site_id"], []).append((k_gen, job))
+    generate = []
+    for site_id, site_jobs in by_site.items():
+        for i in range(0, len(site_jobs), WORKER_TOPICS_PER_CALL):
+            chunk = site_jobs[i : i + WORKER_TOPICS_PER_CALL]
+            keys = {job["topic_key"]: k_gen for k_gen, job in chunk}
+            topics = [{k: v for k, v in job.items() if k != "site_id"} for _, job in chunk]
+            generate.append((keys, call_generate(http, site_id, topics)))
+    return await _gather_bounded(sem, "generate", generate, on_done)
+
+
+async def run():
     env = os.getenv("ENVIRONMENT", "unknown")
-    print(f"[worker] started (ENVIRONMENT={env}) base={ENGINE_BASE_URL}", flush=True)
+    print(f"[worker] started (ENVIRONMENT={env}) base={ENGINE_BASE_URL} concurrency={WORKER_CONCURRENCY}", flush=True)
 
     store = StateStore()
     jobs = load_jobs()
     if not jobs:
         print("[worker] no jobs configured (AUTO_SITES_JSON is empty). Worker will idle.", flush=True)
 
-    while True:
+    # AUTO_SITES_JSON est lu au démarrage : planning fixe pour la vie du process (redeploy pour le changer)
+    analyze, generate = build_schedule(jobs)
+    period = {k: ANALYZE_EVERY for k in analyze}
+    period.update({k: _freq_to_seconds(job["frequency"]) for k, job in generate.items()})
+
+    # Min-heap (due_at, state_key) : le worker dort jusqu'à la prochaine échéance au lieu de tout rescanner.
+    # Reconstruit depuis les last_ts du StateStore (un pipeline) : rien de plus à persister pour un redémarrage.
+    # due_at fait foi : une entrée du heap dont l'échéance ne correspond plus est périmée (ignorée au pop).
+    heap: list[tuple[int, str]] = []
+    due_at: dict[str, int] = {}
+    # Jobs en cours d'appel (tâches de fond) : jamais redispatchés avant leur fin
+    inflight: set[str] = set()
+    wakeup = asyncio.Event()
+
+    def schedule(k: str, at: int):
+        due_at[k] = at
+        heapq.heappush(heap, (at, k))
+
+    def load_heap():
+        last = store.get_ts_many(list(period))
+        heap.clear()
+        due_at.clear()
+        for k in period:
+            if k not in inflight:
+                due_at[k] = last[k] + period[k]
+                heap.append((due_at[k], k))
+        heapq.heapify(heap)
+
+    def finish(keys: list[str], done: list[str]):
+        # Fin d'un appel : ts persisté tout de suite (un redémarrage ne perd pas ce qui est déjà publié)
         now = int(time.time())
-        jobs = load_jobs()  # reload live (Coolify env changes => redeploy usually, but safe)
-
-        # 1) Daily analyze per site
-        seen_sites = set()
-        for j in jobs:
-            site_id = str(j.get("site_id", "")).strip()
-            if not site_id or site_id in seen_sites:
-                continue
-            seen_sites.add(site_id)
-
-            k_an = "analyze:" + _key(site_id)
-            last = store.get_ts(k_an)
-            if now - last >= 24 * 3600:
-                if call_analyze(site_id):
-                    store.set_ts(k_an, now)
-
-        # 2) Generate drafts per job (frequency-based)
-        for j in jobs:
-            site_id = str(j.get("site_id", "")).strip()
-            topic_key = str(j.get("topic_key", "")).strip()
-            frequency = str(j.get("frequency", "1_per_week")).strip()
-            images_count = int(j.get("images_count", 2))
-
-            if not site_id or not topic_key:
-                continue
-
-            every = _freq_to_seconds(frequency)
-            k_gen = "gen:" + _key(site_id, topic_key)
-            last = store.get_ts(k_gen)
-            if now - last >= every:
-                ok = call_generate(site_id, topic_key, frequency, images_count)
-                if ok:
-                    store.set_ts(k_gen, now)
-
-        time.sleep(SLEEP_SECONDS)
+        store.set_ts_many(done, now)
+        done_set = set(done)
+        for k in keys:
+            inflight.discard(k)
+            # échec : nouvel essai après SLEEP_SECONDS (comme l'ancien tick)
+            schedule(k, now + (period[k] if k in done_set else SLEEP_SECONDS))
+        wakeup.set()
+
+    load_heap()
+    next_reload = time.time() + MAX_SLEEP_SECONDS
+    next_poll = 0
+    poll_task: asyncio.Task | None = None
+    # Références fortes sur les tâches de fond (sinon collectables en cours d'exécution)
+    tasks: set[asyncio.Task] = set()
+
+    sem = asyncio.Semaphore(WORKER_CONCURRENCY)
+    # Un seul client pour toute la vie du worker : connexions keep-alive vers l'engine réutilisées entre ticks.
+    # Pool dimensionné sur la concurrence : aucune connexion fermée/rouverte au-delà du défaut httpx (20).
+    limits = httpx.Limits(max_keepalive_connections=WORKER_CONCURRENCY, max_connections=WORKER_CONCURRENCY)
+    async with httpx.AsyncClient(headers=_headers(), timeout=HTTP_TIMEOUT, limits=limits) as http:
+
+        async def tick(due: list[str]):
+            # 1) Analyses dues, puis 2) générations dues (après les analyses du tick)
+            due_an = [(k, call_analyze(http, analyze[k])) for k in due if k in analyze]
+            await _gather_bounded(sem, "analyze", due_an, finish)
+            due_gen = {k: generate[k] for k in due if k in generate}
+            if due_gen:
+                await dispatch_generate(http, sem, due_gen, finish)
+
+        async def poll():
+            try:
+                retry = await poll_batches(http)
+            except Exception as e:
+                print(f"[worker] batch error: {e!r}", flush=True)
+                return
+            # ts posé à la soumission : remis à 0 pour les jobs non publiés (sinon perdus une période)
+            retry_keys = [k for k in ("gen:" + _key(*st) for st in retry) if k in generate and k not in inflight]
+            if retry_keys:
+                store.set_ts_many(retry_keys, 0)
+                for k in retry_keys:
+                    schedule(k, period[k])
+                wakeup.set()
+
+        def spawn(coro) -> asyncio.Task:
+            task = asyncio.create_task(coro)
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+            return task
+
+        while True:
+            now = int(time.time())
+            if now >= next_reload:
+                load_heap()
+                next_reload = now + MAX_SLEEP_SECONDS
+
+            due = []
+            while heap and heap[0][0] <= now:
+                at, k = heapq.heappop(heap)
+                if due_at.get(k) == at and k not in inflight:
+                    due.append(k)
+
+            # Appels en tâches de fond : un appel lent ne retarde ni les jobs dus ensuite ni le relevé des batchs
+            if due:
+                inflight.update(due)
+                spawn(tick(due))
+
+            if WORKER_BATCH and now >= next_poll and (poll_task is None or poll_task.done()):
+                poll_task = spawn(poll())
+                next_poll = now + SLEEP_SECONDS  # résultats de batch relevés à l'ancien rythme
+
+            wake = min(heap[0][0] if heap else next_reload, next_reload)
+            if WORKER_BATCH:
+                wake = min(wake, next_poll)
+            # Réveil à l'échéance, ou plus tôt quand un appel se termine (replanification)
+            wakeup.clear()
+            try:
+                await asyncio.wait_for(wakeup.wait(), timeout=max(1, wake - time.time()))
+            except asyncio.TimeoutError:
+                pass
+
+
+def main():
+    asyncio.run(run())
 
 
 if __name__ == "__main__":
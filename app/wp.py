@@ -1,90 +1,710 @@
+import asyncio
 import base64
-from typing import Any, Dict, Optional
-from urllib.parse import urljoin
+import gzip
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlencode, urlparse
 
+import httpx
+import orjson
 import requests
-from requests.exceptions import RequestException
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectionError, ConnectTimeout, RequestException, Timeout
+
+# Un seul hôte WP par client : quelques pools suffisent, connexions keep-alive réutilisées
+POOL_CONNECTIONS = 4
+# Bulkhead : appels simultanés max par client (= taille du pool de connexions) et attente max d'une place
+MAX_CONCURRENT = 8
+QUEUE_WAIT_S = 5.0
+
+# Routes REST des posts (préfixe /wp-json en appel direct, sans préfixe dans une sous-requête batch)
+_POSTS_PATH = "/wp-json/wp/v2/posts"
+_BATCH_POSTS_PATH = "/wp/v2/posts"
+
+# Framework batch REST de WP (>= 5.6) : 25 sous-requêtes max par appel (filtre rest_get_max_batch_size)
+BATCH_PATH = "/wp-json/batch/v1"
+BATCH_MAX_REQUESTS = 25
+
+# Erreurs transitoires (rate limit / proxy / WP surchargé) : nouvel essai avec backoff exponentiel + jitter.
+# Jamais sur 400/401/403/404/422 (validation, auth) : réessayer ne changerait rien.
+# Une seule boucle de retry (_send / _asend, bornée par la deadline) : aucun retry urllib3 ni httpx en dessous.
+RETRY_STATUSES = (429, 502, 503, 504)
+RETRIES = 3
+BACKOFF_FACTOR = 0.5
+RETRY_AFTER_MAX = 30  # borne sur Retry-After (s)
+# Avec une deadline : pas de nouvel essai s'il reste moins que ça après l'attente (il échouerait en Timeout
+# et masquerait la vraie réponse / erreur du dernier essai)
+RETRY_MIN_ATTEMPT_S = 0.5
+
+# Compression gzip des corps de requête (contenu HTML généré : 5-10x) au-delà de ce seuil.
+# Opt-in (gzip_requests=True) : PHP ne décompresse pas les corps de requête, il faut un serveur
+# (ex: Apache mod_deflate en entrée, nginx + module dédié) configuré pour le faire devant WP.
+GZIP_MIN_BYTES = 2048
+GZIP_LEVEL = 6
+
+# Circuit breaker par hôte WP : après BREAKER_FAILURES échecs consécutifs (réseau / 5xx, retries
+# compris), les appels échouent immédiatement pendant BREAKER_RECOVERY_S, puis un seul appel test.
+BREAKER_FAILURES = 5
+BREAKER_RECOVERY_S = 30.0
+
+# Cache des lectures (get_post / list_posts) : relectures d'un même post pendant une passe de génération
+GET_CACHE_MAXSIZE = 256
+
+# Réponses d'erreur lues au plus sur ERROR_BODY_MAX octets (page HTML de WAF possiblement énorme) ;
+# les réponses OK restent chargées entièrement (payloads WP bornés)
+ERROR_BODY_MAX = 8192
+ERROR_SNIPPET_CHARS = 2000
+
+
+class WordPressAPIError(RequestException):
+    """
+    Réponse WP en erreur (HTTP >= 400) ou corps non JSON, avec accès structuré pour les appelants
+    (retry / breaker) : status_code, retry_after (header Retry-After brut), payload (JSON d'erreur WP
+    si dict, sinon None). response : la réponse requests / httpx d'origine.
+    """
+
+    def __init__(
+        self,
+        message: str,
+        status_code: int,
+        retry_after: Optional[str] = None,
+        payload: Optional[Dict[str, Any]] = None,
+        response=None,
+    ):
+        super().__init__(message, response=response)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.payload = payload
+
+
+class CircuitOpenError(RequestException):
+    """WP considéré indisponible : appel refusé sans requête réseau."""
+
+
+class BulkheadRejected(RequestException):
+    """Trop d'appels WP en cours sur ce client : refusé après QUEUE_WAIT_S d'attente."""
+
+
+class CircuitBreaker:
+    """
+    CLOSED -> OPEN après `failures` échecs consécutifs ; OPEN -> HALF_OPEN après `recovery_s` :
+    un seul appel test passe, succès => CLOSED, échec => OPEN à nouveau.
+    """
+
+    def __init__(self, failures: int = BREAKER_FAILURES, recovery_s: float = BREAKER_RECOVERY_S):
+        self.failures = failures
+        self.recovery_s = recovery_s
+        self.state = "CLOSED"
+        self._count = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def before_call(self) -> None:
+        with self._lock:
+            if self.state == "CLOSED":
+                return
+            if self.state == "OPEN" and time.monotonic() - self._opened_at >= self.recovery_s:
+                self.state = "HALF_OPEN"
+                return  # cet appel est la sonde
+            raise CircuitOpenError("WordPress circuit ouvert (hôte en échec), nouvel essai plus tard")
+
+    def record(self, ok: bool) -> None:
+        with self._lock:
+            if ok:
+                self.state = "CLOSED"
+                self._count = 0
+                return
+            self._count += 1
+            if self.state == "HALF_OPEN" or self._count >= self.failures:
+                self.state = "OPEN"
+                self._opened_at = time.monotonic()
+
+
+# Partagés entre clients (plusieurs WordPressClient vers le même WP)
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def _breaker_for(netloc: str) -> CircuitBreaker:
+    with _breakers_lock:
+        breaker = _breakers.get(netloc)
+        if breaker is None:
+            breaker = _breakers[netloc] = CircuitBreaker()
+        return breaker
 
 
 class WordPressClient:
     """
     Client WordPress REST API (Application Password).
     Utilisé pour le mode "legacy" (WP_* env) côté engine.
-    Pour le mode multi-site via plugin HMAC, on appelle directement requests.post vers /wp-json/llmgeo/v1/*.
+    Pour le mode multi-site via plugin HMAC, l'engine appelle directement /wp-json/llmgeo/v1/* (httpx).
+
+    Utilisable en context manager (with WordPressClient(...) as wp:) pour fermer la session.
+    Variantes async (acreate_draft_post, aupdate_post, aget_post, alist_posts) sur un httpx.AsyncClient
+    HTTP/2 créé à la première utilisation : publications concurrentes via asyncio.gather, multiplexées
+    sur la même connexion. Fermeture : await wp.aclose() ou async with WordPressClient(...) as wp:.
     """
 
+    # Corps de création : clés constantes, title / content (/ excerpt) remplis par appel
+    _DRAFT_TEMPLATE: Dict[str, Any] = {"title": None, "content": None, "excerpt": "", "status": "draft"}
+
     def __init__(
         self,
         base_url: str,
         username: str,
         app_password: str,
-        timeout: int = 20,
+        timeout: float = 20,
         user_agent: str = "Mozilla/5.0 (LLM-GEO-Engine; +https://engine.e-ma.re)",
         verify_tls: bool = True,
+        session: Optional[requests.Session] = None,
+        cache_ttl: float = 5.0,
+        gzip_requests: bool = False,
+        max_concurrent: int = MAX_CONCURRENT,
+        queue_wait_s: float = QUEUE_WAIT_S,
+        connect_timeout: float = 3.0,
     ):
         self.base_url = base_url.rstrip("/") + "/"
+        self._breaker = _breaker_for(urlparse(self.base_url).netloc)
         self.username = username
         self.app_password = app_password
-        self.timeout = timeout
+        # timeout = lecture ; connexion bornée à part (DNS / TLS lents ne consomment pas tout le budget)
+        self.connect_timeout = connect_timeout
+        self.read_timeout = timeout
         self.verify_tls = verify_tls
+        self.gzip_requests = gzip_requests
+        # Bulkhead : une lenteur WP immobilise au plus max_concurrent appelants (threads / tâches),
+        # les suivants attendent queue_wait_s puis BulkheadRejected. Sync et async bornés séparément.
+        self.max_concurrent = max_concurrent
+        self.queue_wait_s = queue_wait_s
+        self._sem = threading.BoundedSemaphore(max_concurrent)
+        self._asem = asyncio.BoundedSemaphore(max_concurrent)
+        # Session partageable (ex: SESSION de app.main) pour réutiliser les connexions keep-alive.
+        # Session fournie : laissée telle quelle (ni adapter monté ni fermeture), elle appartient à l'appelant
+        # (monter ses adapters avec max_retries=0, sinon leurs retries s'ajoutent à ceux de _send).
+        self._owns_session = session is None
+        self._session = session or requests.Session()
+        if self._owns_session:
+            # max_retries=0 : les retries (GET compris) sont faits par _send, qui connaît la deadline
+            adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=max_concurrent, max_retries=0)
+            self._session.mount("https://", adapter)
+            self._session.mount("http://", adapter)
+        self._asession: Optional[httpx.AsyncClient] = None
+        # url -> (monotonic, réponse JSON encodée) ; dict = ordre d'insertion (LRU), cache_ttl=0 désactive
+        self._cache_ttl = cache_ttl
+        self._get_cache: Dict[str, tuple] = {}
+        # Client partagé entre threads (bulkhead sync) : tout accès au cache sous ce verrou
+        self._cache_lock = threading.Lock()
+        # Sous-requêtes différées par update_post(defer=True), envoyées par flush()
+        self._pending_batch: List[Dict[str, Any]] = []
 
-        token = base64.b64encode(f"{username}:{app_password}".encode("utf-8")).decode("ascii")
-        self.headers = {
-            "Authorization": f"Basic {token}",
+        # Construit directement en bytes (requests et httpx acceptent des valeurs de header bytes)
+        raw = username.encode("utf-8") + b":" + app_password.encode("utf-8")
+        self._auth_header = b"Basic " + base64.b64encode(raw)
+        self.headers: Dict[str, Any] = {
+            "Authorization": self._auth_header,
             "Content-Type": "application/json; charset=utf-8",
             "Accept": "application/json",
             "User-Agent": user_agent,
         }
+        # Headers posés une fois sur la session possédée : pas de headers= (copie + fusion) à chaque appel.
+        # Session fournie par l'appelant : pas modifiée, headers passés par requête.
+        if self._owns_session:
+            self._session.headers.update(self.headers)
+            self._call_headers: Optional[Dict[str, Any]] = None
+        else:
+            self._call_headers = self.headers
+
+    def close(self) -> None:
+        if self._owns_session:
+            self._session.close()
+
+    def __enter__(self) -> "WordPressClient":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    async def aclose(self) -> None:
+        if self._asession is not None:
+            await self._asession.aclose()
+            self._asession = None
+        self.close()
+
+    async def __aenter__(self) -> "WordPressClient":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.aclose()
+
+    def _async_session(self) -> httpx.AsyncClient:
+        # Créé à la première coroutine (lié à la boucle en cours) ; retries=0 : retries faits par _asend
+        if self._asession is None:
+            limits = httpx.Limits(
+                max_keepalive_connections=self.max_concurrent, max_connections=self.max_concurrent
+            )
+            self._asession = httpx.AsyncClient(
+                headers=self.headers,
+                timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+                transport=httpx.AsyncHTTPTransport(
+                    http2=True, retries=0, verify=self.verify_tls, limits=limits
+                ),
+            )
+        return self._asession
+
+    def _cache_get(self, url: str) -> Optional[Dict[str, Any]]:
+        with self._cache_lock:
+            entry = self._get_cache.pop(url, None)
+            if entry is None or time.monotonic() - entry[0] >= self._cache_ttl:
+                return None
+            self._get_cache[url] = entry  # réinséré en fin : plus récemment utilisé
+        # Copie neuve à chaque hit : un appelant qui modifie sa réponse n'altère pas le cache
+        return orjson.loads(entry[1])
+
+    def _cache_set(self, url: str, value: Dict[str, Any]) -> None:
+        if self._cache_ttl <= 0:
+            return
+        raw = orjson.dumps(value)  # stocké encodé : jamais le dict rendu à l'appelant
+        with self._cache_lock:
+            self._get_cache.pop(url, None)
+            if len(self._get_cache) >= GET_CACHE_MAXSIZE:
+                self._get_cache.pop(next(iter(self._get_cache)), None)
+            self._get_cache[url] = (time.monotonic(), raw)
+
+    def _invalidate(self, post_ids=()) -> None:
+        # Écriture : le post modifié et toutes les listes (contenu / ordre possiblement changés)
+        urls = [self._url(f"{_POSTS_PATH}/{post_id}") for post_id in post_ids]
+        with self._cache_lock:
+            for url in urls:
+                self._get_cache.pop(url, None)
+            for url in [u for u in self._get_cache if "?" in u]:
+                self._get_cache.pop(url, None)
 
     def _url(self, path: str) -> str:
-        # path peut être "wp-json/wp/v2/posts" ou "/wp-json/wp/v2/posts"
-        path = path.lstrip("/")
-        return urljoin(self.base_url, path)
+        # path peut être "wp-json/wp/v2/posts" ou "/wp-json/wp/v2/posts" ; base_url finit toujours par "/"
+        # => concaténation directe (urljoin refait un parsing complet d'URL à chaque appel)
+        return self.base_url + path.lstrip("/")
+
+    @staticmethod
+    def _retry_delay(attempt: int, r: Optional[requests.Response]) -> float:
+        # full jitter, ou Retry-After (secondes) si WP/WAF l'indique
+        delay = random.uniform(0, BACKOFF_FACTOR * (2 ** attempt))
+        retry_after = r.headers.get("Retry-After") if r is not None else None
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, min(int(retry_after), RETRY_AFTER_MAX))
+        return delay
+
+    def _timeouts(self, deadline: Optional[float]) -> tuple:
+        # (connect, read) bornés par le temps restant avant la deadline (time.monotonic())
+        if deadline is None:
+            return self.connect_timeout, self.read_timeout
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise Timeout("WordPress deadline dépassée")
+        return min(self.connect_timeout, remaining), min(self.read_timeout, remaining)
+
+    @staticmethod
+    def _fits(delay: float, deadline: Optional[float]) -> bool:
+        # un nouvel essai après `delay` a-t-il encore du temps (RETRY_MIN_ATTEMPT_S) avant la deadline ?
+        return deadline is None or time.monotonic() + delay + RETRY_MIN_ATTEMPT_S <= deadline
+
+    def _send(
+        self,
+        method: str,
+        url: str,
+        body: Optional[bytes],
+        headers: Optional[Dict[str, str]],
+        retry: bool,
+        deadline: Optional[float] = None,
+        params: Optional[Dict[str, Any]] = None,
+    ):
+        # Rejouables : GET et POST retry=True (mise à jour idempotente / Idempotency-Key).
+        # Les autres POST ne sont réessayés que sur timeout de connexion (requête jamais envoyée).
+        replayable = retry or method == "GET"
+        attempts = RETRIES + 1
+        for attempt in range(attempts):
+            last = attempt == attempts - 1
+            try:
+                r = self._session.request(
+                    method=method,
+                    url=url,
+                    params=params,
+                    data=body,
+                    headers=headers,
+                    timeout=self._timeouts(deadline),
+                    verify=self.verify_tls,
+                    stream=True,  # corps lu par _request (plafonné si erreur)
+                )
+            except (ConnectionError, Timeout) as e:
+                delay = self._retry_delay(attempt, None)
+                if last or not (replayable or isinstance(e, ConnectTimeout)) or not self._fits(delay, deadline):
+                    raise
+                time.sleep(delay)
+                continue
+            if r.status_code not in RETRY_STATUSES or last or not replayable:
+                return r
+            delay = self._retry_delay(attempt, r)
+            if not self._fits(delay, deadline):
+                return r
+            r.close()  # réponse écartée, corps jamais lu : connexion rendue au pool
+            time.sleep(delay)
+        raise RuntimeError("unreachable")
 
-    def _request(self, method: str, path: str, json_body: Optional[dict] = None) -> Dict[str, Any]:
+    def _request(
+        self,
+        method: str,
+        path: str,
+        json_body: Optional[dict] = None,
+        retry: bool = False,
+        idempotency_key: Optional[str] = None,
+        deadline: Optional[float] = None,
+        params: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """
+        params : query string, encodée par requests/httpx (valeurs échappées).
+        deadline : échéance absolue (time.monotonic()) de l'appel complet : attente du bulkhead, essais et
+        attentes entre essais (backoff / Retry-After) compris, GET inclus ; dépassée => Timeout sans requête.
+        """
         url = self._url(path)
+        body, headers = self._prepare(self._call_headers, json_body, idempotency_key)
+        retry = retry or bool(idempotency_key)
+        wait_s = min(self.queue_wait_s, self._timeouts(deadline)[1])
+        # place du bulkhead prise avant le breaker : une sonde HALF_OPEN n'est jamais refusée après coup
+        if not self._sem.acquire(timeout=wait_s):
+            raise BulkheadRejected(f"WordPress bulkhead saturé ({self.max_concurrent} appels en cours)")
         try:
-            r = requests.request(
-                method=method.upper(),
-                url=url,
-                json=json_body,
-                headers=self.headers,
-                timeout=self.timeout,
-                verify=self.verify_tls,
-            )
-        except RequestException as e:
-            raise RequestException(f"WordPress request failed: {e}") from e
+            self._breaker.before_call()
+            try:
+                r = self._send(method.upper(), url, body, headers, retry, deadline, params)
+            except RequestException:
+                self._breaker.record(False)
+                raise  # exception requests d'origine (type, request / response) conservée
+            except BaseException:
+                self._breaker.record(False)  # jamais bloqué en HALF_OPEN (sonde interrompue)
+                raise
+        finally:
+            self._sem.release()
+        # 4xx = WP répond (auth / validation) : ne compte pas comme panne de l'hôte
+        self._breaker.record(r.status_code < 500)
+        try:
+            head = r.raw.read(ERROR_BODY_MAX, decode_content=True) if r.status_code >= 400 else None
+            return self._parse_response(r, head)
+        finally:
+            r.close()
 
+    def _prepare(
+        self, base: Optional[Dict[str, str]], json_body: Optional[dict], idempotency_key: Optional[str]
+    ) -> tuple:
+        """
+        Corps encodé (orjson, gzip si activé et assez gros) + headers par requête.
+        base : headers à passer par requête (None = déjà portés par la session / le client).
+        """
+        body = None if json_body is None else orjson.dumps(json_body)
+        extra: Dict[str, str] = {}
+        if idempotency_key:
+            # Même clé sur chaque essai : le serveur (plugin / proxy qui la gère) dédoublonne la création
+            extra["Idempotency-Key"] = idempotency_key
+        if self.gzip_requests and body is not None and len(body) > GZIP_MIN_BYTES:
+            body = gzip.compress(body, compresslevel=GZIP_LEVEL)
+            extra["Content-Encoding"] = "gzip"
+        if not extra:
+            return body, base
+        return body, {**(base or {}), **extra}
+
+    @staticmethod
+    def _snippet(raw: bytes) -> str:
+        # tronqué avant décodage : jamais de str de la taille du corps complet
+        return raw[: ERROR_SNIPPET_CHARS * 4].decode("utf-8", errors="replace")[:ERROR_SNIPPET_CHARS]
+
+    @classmethod
+    def _parse_response(cls, r, head: Optional[bytes] = None) -> Dict[str, Any]:
+        # r : requests.Response ou httpx.Response (même surface status_code / content)
+        # head : début du corps (<= ERROR_BODY_MAX octets) pour une erreur, lu par l'appelant
+        # orjson directement sur les bytes (content.rendered peut peser des centaines de Ko)
         # WordPress renvoie parfois des erreurs JSON, parfois du HTML (proxy/WAF).
         if r.status_code >= 400:
+            payload = None
             try:
-                payload = r.json()
+                payload = orjson.loads(head)
                 msg = payload.get("message") or str(payload)
             except Exception:
-                msg = r.text[:2000]
-            raise RequestException(f"WordPress API error {r.status_code}: {msg}")
+                payload = None
+                msg = cls._snippet(head or b"")
+            raise WordPressAPIError(
+                f"WordPress API error {r.status_code}: {msg}",
+                status_code=r.status_code,
+                retry_after=r.headers.get("Retry-After"),
+                payload=payload,
+                response=r,
+            )
 
         try:
-            return r.json()
+            return orjson.loads(r.content)
         except Exception as e:
-            raise RequestException(f"Invalid JSON response from WordPress: {e}\nBody: {r.text[:2000]}") from e
-
-    def create_draft_post(self, title: str, content_html: str, excerpt: str = "") -> Dict[str, Any]:
-        payload = {
-            "title": title,
-            "content": content_html,
-            "excerpt": excerpt,
-            "status": "draft",
-        }
-        return self._request("POST", "/wp-json/wp/v2/posts", json_body=payload)
+            raise WordPressAPIError(
+                f"Invalid JSON response from WordPress: {e}\nBody: {cls._snippet(r.content)}",
+                status_code=r.status_code,
+                response=r,
+            ) from e
+
+    async def _asend(
+        self,
+        method: str,
+        url: str,
+        body: Optional[bytes],
+        headers: Optional[Dict[str, str]],
+        retry: bool,
+        deadline: Optional[float] = None,
+        params: Optional[Dict[str, Any]] = None,
+    ):
+        # Pendant async de _send (mêmes règles de rejeu)
+        http = self._async_session()
+        replayable = retry or method == "GET"
+        attempts = RETRIES + 1
+        for attempt in range(attempts):
+            last = attempt == attempts - 1
+            connect_t, read_t = self._timeouts(deadline)
+            try:
+                req = http.build_request(
+                    method,
+                    url,
+                    params=params,
+                    content=body,
+                    headers=headers,
+                    timeout=httpx.Timeout(read_t, connect=connect_t),
+                )
+                r = await http.send(req, stream=True)  # corps lu par _arequest (plafonné si erreur)
+            except (httpx.ConnectError, httpx.TimeoutException) as e:
+                delay = self._retry_delay(attempt, None)
+                unsent = isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout))
+                if last or not (replayable or unsent) or not self._fits(delay, deadline):
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            if r.status_code not in RETRY_STATUSES or last or not replayable:
+                return r
+            delay = self._retry_delay(attempt, r)
+            if not self._fits(delay, deadline):
+                return r
+            await r.aclose()
+            await asyncio.sleep(delay)
+        raise RuntimeError("unreachable")
+
+    @staticmethod
+    async def _aread_head(r: httpx.Response) -> bytes:
+        head = b""
+        async for chunk in r.aiter_bytes():
+            head += chunk
+            if len(head) >= ERROR_BODY_MAX:
+                break
+        return head[:ERROR_BODY_MAX]
+
+    async def _arequest(
+        self,
+        method: str,
+        path: str,
+        json_body: Optional[dict] = None,
+        retry: bool = False,
+        idempotency_key: Optional[str] = None,
+        deadline: Optional[float] = None,
+        params: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        url = self._url(path)
+        body, headers = self._prepare(None, json_body, idempotency_key)
+        retry = retry or bool(idempotency_key)
+        wait_s = min(self.queue_wait_s, self._timeouts(deadline)[1])
+        try:
+            await asyncio.wait_for(self._asem.acquire(), timeout=wait_s)
+        except asyncio.TimeoutError:
+            raise BulkheadRejected(f"WordPress bulkhead saturé ({self.max_concurrent} appels en cours)")
+        try:
+            self._breaker.before_call()
+            try:
+                r = await self._asend(method.upper(), url, body, headers, retry, deadline, params)
+            except httpx.HTTPError as e:
+                self._breaker.record(False)
+                # RequestException comme en sync ; httpx d'origine gardée en __cause__
+                raise RequestException(f"WordPress request failed: {e}") from e
+            except BaseException:
+                self._breaker.record(False)  # annulation comprise
+                raise
+        finally:
+            self._asem.release()
+        self._breaker.record(r.status_code < 500)
+        try:
+            if r.status_code >= 400:
+                return self._parse_response(r, await self._aread_head(r))
+            await r.aread()
+            return self._parse_response(r)
+        except httpx.HTTPError as e:
+            raise RequestException(f"WordPress request failed: {e}") from e
+        finally:
+            await r.aclose()
+
+    def _draft_payload(self, title: str, content_html: str, excerpt: str) -> Dict[str, Any]:
+        payload = self._DRAFT_TEMPLATE.copy()
+        payload["title"] = title
+        payload["content"] = content_html
+        if excerpt:
+            payload["excerpt"] = excerpt
+        return payload
+
+    def create_draft_post(
+        self,
+        title: str,
+        content_html: str,
+        excerpt: str = "",
+        idempotency_key: Optional[str] = None,
+        deadline: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        # Création non idempotente : rejouée seulement avec une Idempotency-Key fournie par l'appelant
+        # (ex: uuid.uuid4().hex gardé avec le brouillon), sinon un retry pourrait créer un doublon.
+        payload = self._draft_payload(title, content_html, excerpt)
+        # invalidation en finally : l'écriture a pu aboutir côté WP malgré une erreur (timeout...)
+        try:
+            return self._request(
+                "POST", _POSTS_PATH, json_body=payload, idempotency_key=idempotency_key, deadline=deadline
+            )
+        finally:
+            self._invalidate()
 
-    def update_post(self, post_id: int, **fields) -> Dict[str, Any]:
+    def update_post(
+        self, post_id: int, defer: bool = False, deadline: Optional[float] = None, **fields
+    ) -> Dict[str, Any]:
         # fields: title/content/excerpt/status/slug/categories/tags/...
-        return self._request("POST", f"/wp-json/wp/v2/posts/{post_id}", json_body=fields)
+        # defer=True : mise en file pour flush() (un aller-retour pour N mises à jour), retourne {}
+        if defer:
+            self._pending_batch.append({"method": "POST", "path": f"{_BATCH_POSTS_PATH}/{post_id}", "body": fields})
+            return {}
+        # mêmes champs réécrits : rejouable sans risque
+        try:
+            return self._request(
+                "POST", f"{_POSTS_PATH}/{post_id}", json_body=fields, retry=True, deadline=deadline
+            )
+        finally:
+            self._invalidate((post_id,))
+
+    def batch(
+        self,
+        requests_list: List[Dict[str, Any]],
+        validation: str = "normal",
+        idempotent: bool = False,
+        deadline: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """
+        Envoie des sous-requêtes {"method", "path" (sans /wp-json), "body"} via /wp-json/batch/v1.
+        Découpé automatiquement par paquets de BATCH_MAX_REQUESTS ; les réponses sont concaténées
+        dans l'ordre : {"responses": [{"status", "headers", "body"}, ...]}.
+        validation="require-all-validate" : rien n'est écrit si une sous-requête est invalide ; garantie
+        valable pour un seul appel WP, donc refusé (ValueError) au-delà de BATCH_MAX_REQUESTS. Échec de
+        validation (WP 207) : {"failed": "validation", "responses": [erreurs par sous-requête]}.
+        idempotent=True (que des mises à jour) : paquets rejoués sur erreur transitoire.
+        """
+        self._check_batch(requests_list, validation)
+        responses: List[Any] = []
+        failed = None
+        try:
+            for i in range(0, len(requests_list), BATCH_MAX_REQUESTS):
+                chunk = requests_list[i : i + BATCH_MAX_REQUESTS]
+                out = self._request(
+                    "POST",
+                    BATCH_PATH,
+                    json_body={"validation": validation, "requests": chunk},
+                    retry=idempotent,
+                    deadline=deadline,
+                )
+                responses.extend(out.get("responses") or [])
+                failed = failed or out.get("failed")
+        finally:
+            # posts visés (path /wp/v2/posts/<id>) retirés du cache de lecture
+            self._invalidate(
+                r["path"].rsplit("/", 1)[-1]
+                for r in requests_list
+                if r.get("path", "").startswith(_BATCH_POSTS_PATH + "/")
+            )
+        if failed:
+            return {"failed": failed, "responses": responses}
+        return {"responses": responses}
+
+    @staticmethod
+    def _check_batch(requests_list: List[Dict[str, Any]], validation: str) -> None:
+        if validation == "require-all-validate" and len(requests_list) > BATCH_MAX_REQUESTS:
+            raise ValueError(
+                f"require-all-validate: {len(requests_list)} sous-requêtes > BATCH_MAX_REQUESTS "
+                f"({BATCH_MAX_REQUESTS}), atomicité impossible sur plusieurs appels WP"
+            )
+
+    def flush(self, validation: str = "normal", deadline: Optional[float] = None) -> Dict[str, Any]:
+        # Envoie les update_post(defer=True) en attente ; file vidée même en cas d'erreur (pas de double envoi)
+        self._check_batch(self._pending_batch, validation)  # avant de vider : file conservée si refusé
+        pending, self._pending_batch = self._pending_batch, []
+        if not pending:
+            return {"responses": []}
+        return self.batch(pending, validation=validation, idempotent=True, deadline=deadline)
+
+    def _cache_key(self, path: str, params: Optional[Dict[str, Any]]) -> str:
+        # URL complète : "?" dans la clé => liste, purgée à chaque écriture (cf. _invalidate)
+        url = self._url(path)
+        return f"{url}?{urlencode(params)}" if params else url
+
+    def _cached_get(
+        self, path: str, params: Optional[Dict[str, Any]] = None, deadline: Optional[float] = None
+    ) -> Dict[str, Any]:
+        key = self._cache_key(path, params)
+        out = self._cache_get(key)
+        if out is None:
+            out = self._request("GET", path, deadline=deadline, params=params)
+            self._cache_set(key, out)
+        return out
 
-    def get_post(self, post_id: int) -> Dict[str, Any]:
-        return self._request("GET", f"/wp-json/wp/v2/posts/{post_id}")
+    def get_post(self, post_id: int, deadline: Optional[float] = None) -> Dict[str, Any]:
+        return self._cached_get(f"{_POSTS_PATH}/{post_id}", deadline=deadline)
 
-    def list_posts(self, per_page: int = 10, status: str = "draft") -> Dict[str, Any]:
+    def list_posts(self, per_page: int = 10, status: str = "draft", deadline: Optional[float] = None) -> Dict[str, Any]:
         # Simple helper (pas de pagination avancée ici)
-        return self._request("GET", f"/wp-json/wp/v2/posts?per_page={per_page}&status={status}")
+        return self._cached_get(_POSTS_PATH, {"per_page": per_page, "status": status}, deadline)
+
+    # ---- Variantes async (mêmes chemins / payloads / règles de retry que la version sync) ----
+
+    async def acreate_draft_post(
+        self,
+        title: str,
+        content_html: str,
+        excerpt: str = "",
+        idempotency_key: Optional[str] = None,
+        deadline: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        payload = self._draft_payload(title, content_html, excerpt)
+        try:
+            return await self._arequest(
+                "POST", _POSTS_PATH, json_body=payload, idempotency_key=idempotency_key, deadline=deadline
+            )
+        finally:
+            self._invalidate()
+
+    async def aupdate_post(self, post_id: int, deadline: Optional[float] = None, **fields) -> Dict[str, Any]:
+        try:
+            return await self._arequest(
+                "POST", f"{_POSTS_PATH}/{post_id}", json_body=fields, retry=True, deadline=deadline
+            )
+        finally:
+            self._invalidate((post_id,))
+
+    async def _acached_get(
+        self, path: str, params: Optional[Dict[str, Any]] = None, deadline: Optional[float] = None
+    ) -> Dict[str, Any]:
+        key = self._cache_key(path, params)
+        out = self._cache_get(key)
+        if out is None:
+            out = await self._arequest("GET", path, deadline=deadline, params=params)
+            self._cache_set(key, out)
+        return out
+
+    async def aget_post(self, post_id: int, deadline: Optional[float] = None) -> Dict[str, Any]:
+        return await self._acached_get(f"{_POSTS_PATH}/{post_id}", deadline=deadline)
+
+    async def alist_posts(
+        self, per_page: int = 10, status: str = "draft", deadline: Optional[float] = None
+    ) -> Dict[str, Any]:
+        return await self._acached_get(_POSTS_PATH, {"per_page": per_page, "status": status}, deadline)
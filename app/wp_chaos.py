@@ -0,0 +1,101 @@
+"""
+Injection de pannes déterministe (seed) sur les appels WordPress, pour éprouver retries / breaker /
+deadlines du WordPressClient sans WP réel instable. Usage (tests, CI, bench local) :
+
+    session = requests.Session()
+    session.mount("https://", ChaosAdapter(seed=42, p_503=0.3, p_timeout=0.1))
+    wp = WordPressClient(base_url, user, app_password, session=session)
+
+Pannes injectées au niveau de l'adapter, sous la boucle de retry unique de WordPressClient._send :
+GET et POST rejouables sont réessayés (backoff, Retry-After, deadline), chaque essai refait un tirage.
+Adapter sans retry urllib3 (max_retries=0 par défaut), comme ceux montés par le client.
+Même seed + même séquence d'appels => mêmes pannes. Jamais monté par défaut.
+"""
+
+import io
+import random
+import time
+from typing import Optional
+
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ReadTimeout
+from urllib3.response import HTTPResponse
+
+
+class ChaosAdapter(HTTPAdapter):
+    """
+    Un tirage par requête parmi (probabilités cumulées, somme <= 1) :
+    - p_timeout   : ReadTimeout levé sans requête réseau
+    - p_503       : 503 synthétique
+    - p_429       : 429 synthétique avec Retry-After: retry_after
+    - p_malformed : 200 au corps JSON tronqué
+    sinon requête réelle, précédée avec p_slow d'une attente de slow_s secondes.
+    """
+
+    def __init__(
+        self,
+        seed: Optional[int] = None,
+        p_timeout: float = 0.0,
+        p_503: float = 0.0,
+        p_429: float = 0.0,
+        p_malformed: float = 0.0,
+        p_slow: float = 0.0,
+        slow_s: float = 1.0,
+        retry_after: int = 1,
+        **kwargs,
+    ):
+        if p_timeout + p_503 + p_429 + p_malformed > 1:
+            raise ValueError("p_timeout + p_503 + p_429 + p_malformed must be <= 1")
+        super().__init__(**kwargs)
+        self._rng = random.Random(seed)
+        self.p_timeout = p_timeout
+        self.p_503 = p_503
+        self.p_429 = p_429
+        self.p_malformed = p_malformed
+        self.p_slow = p_slow
+        self.slow_s = slow_s
+        self.retry_after = retry_after
+        # Compteurs par type de panne injectée (assertions de tests)
+        self.injected = {"timeout": 0, "503": 0, "429": 0, "malformed": 0, "slow": 0}
+
+    def _fake(self, request, status: int, body: bytes, headers: Optional[dict] = None):
+        # Réponse urllib3 non préchargée : même chemin que le réseau (stream, raw.read plafonné...)
+        raw = HTTPResponse(
+            body=io.BytesIO(body),
+            headers={"Content-Type": "application/json; charset=utf-8", **(headers or {})},
+            status=status,
+            preload_content=False,
+            decode_content=False,
+        )
+        return self.build_response(request, raw)
+
+    def send(self, request, **kwargs):
+        draw = self._rng.random()
+        slow = self._rng.random() < self.p_slow  # tiré à chaque appel : séquence indépendante des pannes
+
+        threshold = self.p_timeout
+        if draw < threshold:
+            self.injected["timeout"] += 1
+            raise ReadTimeout("chaos: injected read timeout", request=request)
+        threshold += self.p_503
+        if draw < threshold:
+            self.injected["503"] += 1
+            return self._fake(request, 503, b'{"code":"chaos","message":"injected 503"}')
+        threshold += self.p_429
+        if draw < threshold:
+            self.injected["429"] += 1
+            return self._fake(
+                request,
+                429,
+                b'{"code":"chaos","message":"injected 429"}',
+                {"Retry-After": str(self.retry_after)},
+            )
+        threshold += self.p_malformed
+        if draw < threshold:
+            self.injected["malformed"] += 1
+            return self._fake(request, 200, b'{"id": 1, "title": {"rendered": "trunc')
+
+        if slow:
+            self.injected["slow"] += 1
+            time.sleep(self.slow_s)
+        return super().send(request, **kwargs)
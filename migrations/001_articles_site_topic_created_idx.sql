@@ -0,0 +1,7 @@
+-- Maillage interne (build_internal_links_block) :
+-- WHERE site_id = ? AND topic_key = ? AND wp_url IS NOT NULL ORDER BY created_at DESC LIMIT n
+-- => parcours d'index borné au lieu d'un scan + tri de tous les articles du site.
+-- CONCURRENTLY : à exécuter hors transaction (psql -f), sans bloquer les écritures.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS articles_site_topic_created_idx
+    ON articles (site_id, topic_key, created_at DESC)
+    WHERE wp_url IS NOT NULL;
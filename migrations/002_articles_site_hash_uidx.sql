@@ -0,0 +1,8 @@
+-- Dédoublonnage atomique des brouillons : la réservation d'article fait
+-- INSERT ... ON CONFLICT (site_id, content_hash) DO UPDATE SET content_hash = EXCLUDED.content_hash
+-- RETURNING id, wp_post_id, wp_url, (xmax = 0) AS inserted  (xmax = 0 <=> ligne créée par cette requête).
+-- Pré-requis : aucun doublon existant (sinon la création échoue) :
+--   SELECT site_id, content_hash, count(*) FROM articles GROUP BY 1, 2 HAVING count(*) > 1;
+-- CONCURRENTLY : à exécuter hors transaction (psql -f), sans bloquer les écritures.
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS articles_site_hash_uidx
+    ON articles (site_id, content_hash);
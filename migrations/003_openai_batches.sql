@@ -0,0 +1,16 @@
+-- Génération par lot (API Batch OpenAI) : /api/batches enregistre le batch soumis,
+-- /api/batches/poll le publie une fois "completed".
+-- jobs : {custom_id: {site_id, topic_key, frequency, images_count, lang}}
+-- status : submitted -> processing -> done | failed | expired | cancelled
+-- (processing non terminé après BATCH_PROCESSING_TIMEOUT : repris par le poll suivant)
+CREATE TABLE IF NOT EXISTS openai_batches (
+    id          bigserial PRIMARY KEY,
+    batch_id    text NOT NULL UNIQUE,
+    status      text NOT NULL DEFAULT 'submitted',
+    jobs        jsonb NOT NULL,
+    result      jsonb,
+    created_at  timestamptz NOT NULL DEFAULT now(),
+    updated_at  timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS openai_batches_status_idx ON openai_batches (status, created_at);
@@ -0,0 +1,12 @@
+-- Filtres par contenu jsonb (value @> '{"k": "v"}' / meta @> ...) pour les futures fonctionnalités :
+-- bitmap scan GIN au lieu d'un seq scan. jsonb_path_ops : index plus petit et @> plus rapide
+-- que l'opclass par défaut (seul @> est supporté, suffisant ici).
+-- Les lectures actuelles (site_id, key) restent sur l'index unique btree de memories.
+-- articles.meta est NULL tant que le brouillon est "pending" : index partiel.
+-- CONCURRENTLY : à exécuter hors transaction (psql -f), sans bloquer les écritures.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS memories_value_gin
+    ON memories USING gin (value jsonb_path_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS articles_meta_gin
+    ON articles USING gin (meta jsonb_path_ops)
+    WHERE meta IS NOT NULL;
@@ -0,0 +1,73 @@
+"""
+Cache de lecture du WordPressClient : isolement des réponses rendues et accès concurrents.
+"""
+
+import io
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.response import HTTPResponse
+
+from app import wp
+
+
+class CountingWP(HTTPAdapter):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.sent = 0
+
+    def send(self, request, **kwargs):
+        self.sent += 1
+        raw = HTTPResponse(
+            body=io.BytesIO(b'{"id": 1, "title": {"rendered": "original"}}'),
+            headers={"Content-Type": "application/json"},
+            status=200,
+            preload_content=False,
+        )
+        return self.build_response(request, raw)
+
+
+def make_client(base_url: str) -> tuple[wp.WordPressClient, CountingWP]:
+    adapter = CountingWP()
+    session = requests.Session()
+    session.mount("https://", adapter)
+    return wp.WordPressClient(base_url, "user", "app pass", session=session, cache_ttl=60), adapter
+
+
+def test_cached_response_not_altered_by_caller():
+    client, adapter = make_client("https://cache-copy.test")
+    post = client.get_post(1)
+    post["title"]["rendered"] = "modifié"
+    again = client.get_post(1)
+    assert again["title"]["rendered"] == "original"
+    assert again is not post
+    assert adapter.sent == 1  # second appel servi par le cache
+
+
+def test_cache_concurrent_set_and_invalidate():
+    client, _ = make_client("https://cache-threads.test")
+    errors = []
+
+    def writer(offset: int):
+        try:
+            for i in range(2000):
+                client._cache_set(f"{client.base_url}list?page={offset + i}", {"i": i})
+        except Exception as e:  # pragma: no cover - échec du test
+            errors.append(e)
+
+    def invalidator():
+        try:
+            for i in range(2000):
+                client._invalidate((i,))
+        except Exception as e:  # pragma: no cover - échec du test
+            errors.append(e)
+
+    threads = [threading.Thread(target=writer, args=(n * 10000,)) for n in range(3)]
+    threads.append(threading.Thread(target=invalidator))
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    assert len(client._get_cache) <= wp.GET_CACHE_MAXSIZE
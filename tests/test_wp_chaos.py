@@ -0,0 +1,165 @@
+"""
+Retries / breaker / deadline du WordPressClient (sync) sous pannes injectées par ChaosAdapter (seed fixe).
+Aucun accès réseau : les requêtes qui passent le tirage sont servies par un faux WP en mémoire.
+"""
+
+import io
+import itertools
+import time
+
+import pytest
+import requests
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ReadTimeout
+from urllib3.response import HTTPResponse
+
+from app import wp
+from app.wp_chaos import ChaosAdapter
+
+_hosts = itertools.count()
+
+
+class FakeWP(HTTPAdapter):
+    # Répond 200 {"id": 1} à tout ce qui atteint le « réseau »
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.sent = 0
+
+    def send(self, request, **kwargs):
+        self.sent += 1
+        raw = HTTPResponse(
+            body=io.BytesIO(b'{"id": 1, "title": {"rendered": "ok"}}'),
+            headers={"Content-Type": "application/json"},
+            status=200,
+            preload_content=False,
+        )
+        return self.build_response(request, raw)
+
+
+class OfflineChaos(ChaosAdapter, FakeWP):
+    """ChaosAdapter dont super().send() tombe sur FakeWP au lieu du réseau."""
+
+
+@pytest.fixture
+def no_sleep(monkeypatch):
+    # backoff / Retry-After sans attente réelle ; les décisions de retry restent celles du client
+    sleeps = []
+    monkeypatch.setattr(wp.time, "sleep", sleeps.append)
+    return sleeps
+
+
+def make_client(adapter: ChaosAdapter, **kwargs) -> wp.WordPressClient:
+    # Hôte unique par test : breaker (partagé par hôte) et cache isolés
+    base_url = f"https://wp{next(_hosts)}.test"
+    session = requests.Session()
+    session.mount("https://", adapter)
+    return wp.WordPressClient(base_url, "user", "app pass", session=session, cache_ttl=0, **kwargs)
+
+
+def test_get_retried_on_503_then_raises_structured_error(no_sleep):
+    adapter = OfflineChaos(seed=42, p_503=1.0)
+    client = make_client(adapter)
+    with pytest.raises(wp.WordPressAPIError) as exc:
+        client.get_post(1)
+    assert exc.value.status_code == 503
+    assert adapter.injected["503"] == wp.RETRIES + 1
+    assert adapter.sent == 0
+    assert len(no_sleep) == wp.RETRIES
+
+
+def test_get_retried_on_read_timeout(no_sleep):
+    adapter = OfflineChaos(seed=42, p_timeout=1.0)
+    client = make_client(adapter)
+    with pytest.raises(ReadTimeout):
+        client.get_post(1)
+    assert adapter.injected["timeout"] == wp.RETRIES + 1
+
+
+def test_seeded_faults_are_reproducible(no_sleep):
+    def run():
+        adapter = OfflineChaos(seed=7, p_503=0.4, p_429=0.2)
+        client = make_client(adapter)
+        outcomes = []
+        for post_id in range(10):
+            try:
+                outcomes.append(client.get_post(post_id)["id"])
+            except wp.WordPressAPIError as e:
+                outcomes.append(e.status_code)
+        return outcomes, dict(adapter.injected), adapter.sent
+
+    first = run()
+    assert first == run()
+    outcomes, injected, sent = first
+    # chaque essai = une panne injectée ou un envoi réel ; un succès par appel non épuisé
+    assert sent == outcomes.count(1)
+    assert injected["503"] + injected["429"] + sent >= len(outcomes)
+
+
+def test_non_idempotent_create_not_replayed(no_sleep):
+    adapter = OfflineChaos(seed=1, p_503=1.0)
+    client = make_client(adapter)
+    with pytest.raises(wp.WordPressAPIError):
+        client.create_draft_post("t", "<p>c</p>")
+    assert adapter.injected["503"] == 1
+
+
+def test_create_with_idempotency_key_replayed(no_sleep):
+    adapter = OfflineChaos(seed=1, p_503=1.0)
+    client = make_client(adapter)
+    with pytest.raises(wp.WordPressAPIError):
+        client.create_draft_post("t", "<p>c</p>", idempotency_key="k1")
+    assert adapter.injected["503"] == wp.RETRIES + 1
+
+
+def test_retry_after_beyond_deadline_stops_immediately():
+    # Vraies attentes : Retry-After 4s ne tient pas dans une deadline de 1s => un seul essai, sans dormir
+    adapter = OfflineChaos(seed=3, p_429=1.0, retry_after=4)
+    client = make_client(adapter)
+    start = time.monotonic()
+    with pytest.raises(wp.WordPressAPIError) as exc:
+        client.get_post(1, deadline=time.monotonic() + 1.0)
+    assert time.monotonic() - start < 1.0
+    assert exc.value.status_code == 429
+    assert exc.value.retry_after == "4"
+    assert adapter.injected["429"] == 1
+
+
+def test_deadline_bounds_total_time_with_backoff():
+    # Timeouts injectés à chaque essai : backoff réel, total borné par la deadline
+    adapter = OfflineChaos(seed=5, p_timeout=1.0)
+    client = make_client(adapter)
+    start = time.monotonic()
+    with pytest.raises(ReadTimeout):
+        client.get_post(1, deadline=time.monotonic() + 1.5)
+    assert time.monotonic() - start < 1.5
+    assert 1 <= adapter.injected["timeout"] <= wp.RETRIES + 1
+
+
+def test_breaker_opens_then_half_open_probe(no_sleep):
+    adapter = OfflineChaos(seed=11, p_503=1.0)
+    client = make_client(adapter)
+    breaker = client._breaker
+
+    for _ in range(wp.BREAKER_FAILURES):
+        with pytest.raises(wp.WordPressAPIError):
+            client.get_post(1)
+    assert breaker.state == "OPEN"
+
+    # OPEN : refusé sans requête
+    injected = adapter.injected["503"]
+    with pytest.raises(wp.CircuitOpenError):
+        client.get_post(1)
+    assert adapter.injected["503"] == injected
+
+    # Après recovery_s : une sonde HALF_OPEN ; en échec => OPEN à nouveau
+    breaker._opened_at -= breaker.recovery_s
+    with pytest.raises(wp.WordPressAPIError):
+        client.get_post(1)
+    assert breaker.state == "OPEN"
+
+    # Sonde réussie => CLOSED
+    breaker._opened_at -= breaker.recovery_s
+    adapter.p_503 = 0.0
+    assert client.get_post(1)["id"] == 1
+    assert breaker.state == "CLOSED"
+    assert adapter.sent == 1